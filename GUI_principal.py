@@ -9,8 +9,10 @@ import os
 import  tkinter as tk
 from tkinter import ttk
 import numpy as np
-from iniciacion import curvas_iniciacion
-from propagacion import MAT
+from iniciacion import tension_parametro,leer_tabla
+from cache_tablas import obtener_tablas
+from material import Material
+from biblioteca import biblioteca, constantes
 from principal import principal,pintar_grafica_a_N_todas,pintar_grafica_iniciacion
 from estadistica import*
 import matplotlib.pyplot as plt
@@ -41,8 +43,10 @@ class programa(tk.Tk):
         self.par =""
         self.W =0.0
         self.da =0.0
+        self.malla =None #Malla de las curvas de iniciacion (por defecto MALLA_INICIACION)
         self.filename =""
         self.df =pd.DataFrame()
+        self.cancelado = False
         
         
         
@@ -118,11 +122,13 @@ class programa(tk.Tk):
         self.boton_guardar.grid(column = 1,row =len(self.props),padx =2, pady =5,sticky= tk.W)
         self.tabs["Material"].bind("<Return>",self.guardar_campos)
 
-        #combobox
-        self.comb_val = ["Aluminio"]
+        #combobox con los materiales de la biblioteca
+        self.comb_val = biblioteca().nombres()
         self.combo = ttk.Combobox(props_lf,width = 30,value =self.comb_val,font =("Arial",12,"bold"),foreground="green",background="black")
         self.combo.bind("<<ComboboxSelected>>",self.combosel) 
         self.combo.grid(column = 0, row = len(self.props)+1,columnspan=2,padx = 5, pady = 8)
+        self.boton_guardar_mat= ttk.Button(props_lf,text="Guardar en la biblioteca",width=42,command = self.guardar_material)
+        self.boton_guardar_mat.grid(column = 0,row =len(self.props)+2,columnspan=2,padx =2, pady =5)
         
        
         ### Label Frame del resumen 
@@ -172,6 +178,12 @@ class programa(tk.Tk):
         #boton de probar
         self.ini_btn = ttk.Button(self.vars_iniciacion_frame,text = "Ejecutar iniciación",command =self.ejecutar_curvas)
         self.ini_btn.grid(column = 0,row=2 ,columnspan=6 ,sticky=tk.W,padx = 5, pady = 5)
+        
+        #barra de progreso y boton de cancelar de las curvas de iniciación
+        self.ini_progreso = ttk.Progressbar(self.vars_iniciacion_frame,orient =tk.HORIZONTAL,length = 200,mode ="determinate",maximum =1.0)
+        self.ini_progreso.grid(column = 0,row=3 ,columnspan=4 ,sticky=tk.W,padx = 5, pady = 5)
+        self.cancelar_btn = ttk.Button(self.vars_iniciacion_frame,text = "Cancelar",command =self.cancelar_curvas,state =tk.DISABLED)
+        self.cancelar_btn.grid(column = 4,row=3 ,columnspan=2 ,sticky=tk.W,padx = 5, pady = 5)
 
        
         
@@ -332,10 +344,47 @@ class programa(tk.Tk):
     def combosel(self,event):
         """Selecciona un valor de la lista y completa los campos con los valores asignados.
         """
+        #Solo se completan los campos. Los calculos utilizan la entrada de la 
+        #biblioteca (y sus tablas ya calculadas) si las propiedades 
+        #confirmadas coinciden con las del material seleccionado
+        mat = biblioteca()[self.combo.get()].MAT
         for prop in self.props:
             if prop != "G" or prop !="a_0":
                 self.props_entries[prop].delete(0,tk.END)
-                self.props_entries[prop].insert(0,MAT[prop])   
+                self.props_entries[prop].insert(0,mat[prop])   
+    
+    def entrada_material(self):
+        """Devuelve la entrada de la biblioteca del material seleccionado si 
+        sus propiedades coinciden con las confirmadas, o None si no es asi.
+        Las constantes que no tienen campo en la interfaz (las del termino 
+        plastico de Coffin-Manson) se toman de la entrada.
+        """
+        nombre = self.combo.get().strip()
+        if nombre not in biblioteca():
+            return None
+        entrada = biblioteca()[nombre]
+        if entrada.MAT != Material.desde_dict(dict(constantes(entrada.MAT),**self.dict_prop)):
+            return None
+        return entrada
+    
+    def guardar_material(self):
+        """Guarda las propiedades confirmadas en la biblioteca de materiales 
+        con el nombre escrito en la lista de materiales.
+        """
+        nombre = self.combo.get().strip()
+        if not nombre:
+            tk.messagebox.showerror("ERROR","Escribe el nombre del material en la lista de materiales.")
+            return
+        #Las constantes sin campo en la interfaz de un material que ya 
+        #existe se conservan
+        previas = constantes(biblioteca()[nombre].MAT) if nombre in biblioteca() else {}
+        try:
+            biblioteca().guardar(nombre,Material.desde_dict(dict(previas,**self.dict_prop)))
+        except KeyError:
+            tk.messagebox.showerror("ERROR","No se han confirmado las propiedades del material.")
+            return
+        self.comb_val = biblioteca().nombres()
+        self.combo.config(value =self.comb_val)
     
     def borrar_campos(self):
         """Elimina los valores de los campos.
@@ -364,11 +413,13 @@ class programa(tk.Tk):
         self.props_entries["G"].config(state=tk.NORMAL)
         self.props_entries["a_0"].config(state=tk.NORMAL)
 
-        self.dict_prop["G"]=self.dict_prop["E"]/(2.0*(1.0 + self.dict_prop["nu"]))
+        #Las constantes derivadas se calculan con el material
+        material = Material.desde_dict(self.dict_prop)
+        self.dict_prop["G"]=material.G
         self.mat_values["G"].set(self.dict_prop["G"])
         self.props_entries["G"].insert(0,self.mat_values["G"].get())
 
-        self.dict_prop["a_0"]=1/np.pi*(self.dict_prop["K_th"]/(self.dict_prop["sigma_fl"]))**2.0
+        self.dict_prop["a_0"]=material.a_0
         self.mat_values["a_0"].set(self.dict_prop["a_0"])
         self.props_entries["a_0"].insert(0,self.mat_values["a_0"].get())
         if len(self.dict_prop)==len(self.props):
@@ -413,17 +464,69 @@ class programa(tk.Tk):
         self.da =float(self.da_entry.get())
         self.W= float(self.W_entry.get())
         
-        self.N_i,self.n_a,self.v_sigma =curvas_iniciacion(par = self.par, da=self.da,ac=self.ac_param.get(), W = self.W, MAT=self.dict_prop)
+        self.cancelado = False
+        self.ini_btn.config(state =tk.DISABLED)
+        self.cancelar_btn.config(state =tk.NORMAL)
+        
+        #Si la tabla ya se ha calculado con los mismos datos se carga de la
+        #cache sin volver a calcularla. Con un material de la biblioteca se 
+        #utiliza su entrada, que recuerda las tablas ya pedidas
+        entrada = self.entrada_material()
+        if entrada is not None:
+            ruta = entrada.tabla(self.par,self.ac_param.get(),self.da,self.W,self.malla,n_procesos = None,progreso = self.progreso_curvas)
+            rutas = None if ruta is None else {self.ac_param.get(): ruta}
+            material = entrada.MAT
+        else:
+            material = Material.desde_dict(self.dict_prop)
+            rutas =obtener_tablas(par = self.par, da=self.da,ac=self.ac_param.get(), W = self.W, MAT=material,malla=self.malla,n_procesos = None,progreso = self.progreso_curvas)
+        
+        self.ini_btn.config(state =tk.NORMAL)
+        self.cancelar_btn.config(state =tk.DISABLED)
+        
+        #Si se ha cancelado no se ha escrito el archivo. Las filas calculadas
+        #quedan en el punto de control y el siguiente calculo con los mismos
+        #datos continua desde ellas
+        if rutas is None:
+            self.ini_progreso["value"] = 0.0
+            return
+        
+        self.ini_progreso["value"] = 1.0
+        self.filename = rutas[self.ac_param.get()]
+        v_param,v_a,self.N_i = leer_tabla(self.filename)
+        self.v_sigma = tension_parametro(self.par,v_param,material)
+        self.n_a = len(v_a)
 
         self.plot_iniciacion()
-        self.cargar_csv()
+        self.cargar_csv(self.filename)
+        
+    def progreso_curvas(self,completado):
+        """Actualiza la barra de progreso de las curvas de iniciación y 
+        atiende los eventos de la ventana. Devuelve False si se ha pulsado 
+        cancelar."""
+        self.ini_progreso["value"] = completado
+        self.update()
+        return not self.cancelado
+    
+    def cancelar_curvas(self):
+        self.cancelado = True
       
         
-    def cargar_csv(self):
+    def leer_df_tabla(self,filename):
+        """Devuelve un DataFrame con una tabla de curvas de iniciación, binaria
+        (.npy) o de texto, con los tamaños de grieta como columnas."""
+        if os.path.splitext(filename)[1] == ".npy":
+            v_param,v_a,N_i = leer_tabla(filename)
+            columnas = ["{:.3e}".format(a) for a in np.append(0.0,v_a)]
+            return pd.DataFrame(np.column_stack((v_param,N_i)),columns = columnas)
+        return pd.read_table(filename,sep="\s+")
+        
+    def cargar_csv(self,filename=None):
         
         try: 
-            self.filename ="curvas_inic/{}/MAT_{}.dat".format(self.ac_param.get(),self.par)
-            self.df  =pd.read_table(self.filename,sep="\s+")
+            if filename is None:
+                filename ="curvas_inic/{}/MAT_{}.npy".format(self.ac_param.get(),self.par)
+            self.filename = filename
+            self.df  =self.leer_df_tabla(self.filename)
         
         except ValueError:
             print("NO existe el archivo")
@@ -524,8 +627,8 @@ class programa(tk.Tk):
     def abrir_resultados_iniciacion(self):
         self.tree_view.delete(*self.tree_view.get_children())
         try: 
-            self.filename =tk.filedialog.askopenfilename(initialdir="curvas_inic/",title="Abrir archivo de iniciación",filetypes=(("archivo DAT","*.dat"),("archivo csv","*.csv"),("Todos los archivos","*.*")))
-            self.df  =pd.read_table(self.filename,sep="\s+")
+            self.filename =tk.filedialog.askopenfilename(initialdir="curvas_inic/",title="Abrir archivo de iniciación",filetypes=(("archivo NPY","*.npy"),("archivo DAT","*.dat"),("archivo csv","*.csv"),("Todos los archivos","*.*")))
+            self.df  =self.leer_df_tabla(self.filename)
         
         except ValueError:
             print("NO existe el archivo")
@@ -574,6 +677,13 @@ class programa(tk.Tk):
         self.par =self.var_param.get()
         self.W = float(self.W_entry.get())
         self.trat = self.dict_acabados[self.acabado_var.get()]
+        #Paso y malla de las curvas de iniciacion de la pestaña de iniciacion, 
+        #para que el calculo utilice las mismas tablas de la cache
+        try:
+            self.da = float(self.da_entry.get())
+        except ValueError:
+            tk.messagebox.showerror("ERROR","El paso da de las curvas de iniciación no es válido.")
+            return
 
         pat_max =r'TENSOR_TRAC\S+_{}'.format(self.combo_ejec.get())
         pat_min  =r'TENSOR_COM\S+_{}'.format(self.combo_ejec.get())
@@ -582,7 +692,11 @@ class programa(tk.Tk):
         exp_min  = list(filter(lambda i: re.match(pat_min,i),self.files_exp))[0][:-4]
         
         try:
-            a_inic,v_ai_mm, N_t_min,N_t,N_p, N_i, N_a = principal(self.par,self.W,self.dict_prop,self.ac_param.get(),self.trat,exp_max,exp_min)
+            #Con un material de la biblioteca se pasa su nombre para que 
+            #principal utilice la misma entrada y sus tablas
+            entrada = self.entrada_material()
+            MAT = Material.desde_dict(self.dict_prop) if entrada is None else entrada.nombre
+            a_inic,v_ai_mm, N_t_min,N_t,N_p, N_i, N_a = principal(self.par,self.W,MAT,self.ac_param.get(),self.trat,exp_max,exp_min,da_curvas=self.da,malla_curvas=self.malla)
             
             self.a_N_fig = pintar_grafica_a_N_todas(N_a,v_ai_mm)
             self.a_N_chart= FigureCanvasTkAgg(self.a_N_fig,self.graf_ini_lf)
@@ -598,8 +712,13 @@ class programa(tk.Tk):
             self.cicl_TB.update()
             self.cicl_chart.get_tk_widget().pack(fill = tk.BOTH,expand=1,padx =5, pady = 5)
 
-            self.lbl_lon_ini.config(text = self.lbl_lon_ini["text"] +"{:.3f} mm".format(a_inic))
-            self.lbl_cicl.config(text = self.lbl_cicl["text"]+" {:.0f}".format(N_t_min))
+            if np.isfinite(N_t_min):
+                self.lbl_lon_ini.config(text = self.lbl_lon_ini["text"] +"{:.3f} mm".format(a_inic))
+                self.lbl_cicl.config(text = self.lbl_cicl["text"]+" {:.0f}".format(N_t_min))
+            else:
+                #Run-out: la grieta se detiene para todas las longitudes
+                self.lbl_lon_ini.config(text = self.lbl_lon_ini["text"] +"-")
+                self.lbl_cicl.config(text = self.lbl_cicl["text"]+" vida infinita (run-out)")
             self.lbl_ubi.config(text = self.lbl_ubi["text"]+"resultados/{}/datos/{}/{}.dat".format(self.trat,self.par,self.combo_ejec.get()))
         
             tk.messagebox.showinfo("Atención","El resultado del cálculo ha sido añadido al final del archivo resultados.dat")
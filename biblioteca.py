@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Created on:
+
+@author: David García y Alejandro Quirós
+
+Biblioteca de materiales. Los materiales se guardan por nombre en un archivo
+JSON (materiales.json) con sus constantes. Cada material de la biblioteca
+tiene asociadas las tablas de curvas de iniciacion de cada parametro y 
+geometria. Las tablas se calculan la primera vez que se piden y se guardan 
+en la cache de tablas (ver cache_tablas), de forma que al cambiar de 
+material en principal o en la interfaz se cargan sin volver a calcularlas.
+Las curvas de umbral y las matrices de influencia de K_I se guardan en las
+memorias de propagacion (curva_umbral, matriz_influencia), indexadas por el
+material y la malla, por lo que no se repiten en la biblioteca.
+"""
+
+import os
+import json
+from functools import lru_cache
+from material import Material, CONSTANTES
+from iniciacion import interpolador_tabla
+from cache_tablas import obtener_tablas, RUTA_CACHE, TAM_MAX
+
+RUTA_BIBLIOTECA = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "materiales.json")
+
+###############################################################################
+###############################################################################
+
+class EntradaMaterial:
+    """Material de la biblioteca con sus tablas de curvas de iniciacion. 
+    Las tablas se calculan la primera vez que se piden y se guardan en la 
+    cache de tablas; la entrada recuerda las rutas de las que ya se han 
+    pedido."""
+
+    def __init__(self, nombre, MAT, ruta_cache=RUTA_CACHE, tam_max=TAM_MAX):
+        """INPUTS: nombre     = nombre del material en la biblioteca
+                   MAT        = constantes del material (Material)
+                   ruta_cache = carpeta de la cache de tablas
+                   tam_max    = (bytes) tamaño maximo de la cache"""
+
+        self.nombre     = nombre
+        self.MAT        = MAT
+        self.ruta_cache = ruta_cache
+        self.tam_max    = tam_max
+        self.tablas     = {}
+
+    def __repr__(self):
+        return "EntradaMaterial({!r}, {!r})".format(self.nombre, self.MAT)
+
+    def tabla(self, par, ac, da, W, malla=None, **opciones):
+        """Devuelve la ruta de la tabla de curvas de iniciacion del material.
+        Si no esta en la cache se calcula (ver obtener_tablas).
+
+        INPUTS:  par, ac, da, W, malla, opciones = ver obtener_tablas
+
+        OUTPUT:  ruta = ruta de la tabla o None si se ha cancelado el
+                        calculo"""
+
+        clave = (par, ac, da, W,
+                 None if malla is None else tuple(sorted(malla.items())),
+                 bool(opciones.get("lote", True)))
+
+        #Una tabla que ya se ha pedido solo se comprueba que sigue en la
+        #cache
+        if clave in self.tablas and os.path.isfile(self.tablas[clave]):
+            return self.tablas[clave]
+
+        rutas = obtener_tablas(par, da, ac, W, self.MAT, self.ruta_cache,
+                               self.tam_max, malla=malla, **opciones)
+        if rutas is None:
+            return None
+
+        self.tablas[clave] = rutas[ac]
+
+        return rutas[ac]
+
+    def interpolador(self, par, ac, da, W, malla=None, **opciones):
+        """Devuelve la funcion de interpolacion de la tabla de curvas de
+        iniciacion del material (ver interpolador_tabla)."""
+
+        ruta = self.tabla(par, ac, da, W, malla, **opciones)
+
+        return None if ruta is None else interpolador_tabla(ruta)
+
+    def precalcular(self, pars, acs, da, W, malla=None, **opciones):
+        """Calcula las tablas de curvas de iniciacion del material que
+        faltan en la cache para varios parametros y geometrias. Las
+        geometrias de cada parametro se calculan de una vez.
+
+        INPUTS: pars = lista de parametros
+                acs  = lista de geometrias
+                da, W, malla, opciones = ver obtener_tablas"""
+
+        for par in pars:
+            obtener_tablas(par, da, list(acs), W, self.MAT, self.ruta_cache,
+                           self.tam_max, malla=malla, **opciones)
+
+###############################################################################
+###############################################################################
+
+class Biblioteca:
+    """Biblioteca de materiales guardada en un archivo JSON. El archivo se
+    vuelve a leer si cambia, y los materiales cuyas constantes no han
+    cambiado conservan sus datos calculados."""
+
+    def __init__(self, ruta=RUTA_BIBLIOTECA, ruta_cache=RUTA_CACHE,
+                 tam_max=TAM_MAX):
+        """INPUTS: ruta       = ruta del archivo de la biblioteca
+                   ruta_cache = carpeta de la cache de tablas
+                   tam_max    = (bytes) tamaño maximo de la cache"""
+
+        self.ruta       = ruta
+        self.ruta_cache = ruta_cache
+        self.tam_max    = tam_max
+        self.entradas   = {}
+        self.version    = None
+
+    def cargar(self):
+        """Lee el archivo de la biblioteca si ha cambiado desde la ultima
+        lectura."""
+
+        version = (os.stat(self.ruta).st_mtime_ns
+                   if os.path.isfile(self.ruta) else None)
+        if version == self.version:
+            return
+
+        datos = {}
+        if version is not None:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+
+        entradas = {}
+        for nombre, constantes in datos.items():
+            MAT = Material.desde_dict(constantes)
+            if nombre in self.entradas and self.entradas[nombre].MAT == MAT:
+                entradas[nombre] = self.entradas[nombre]
+            else:
+                entradas[nombre] = EntradaMaterial(nombre, MAT,
+                                                   self.ruta_cache,
+                                                   self.tam_max)
+
+        self.entradas = entradas
+        self.version  = version
+
+    def nombres(self):
+        """Devuelve la lista de nombres de los materiales."""
+
+        self.cargar()
+
+        return list(self.entradas)
+
+    def __contains__(self, nombre):
+        self.cargar()
+
+        return nombre in self.entradas
+
+    def __getitem__(self, nombre):
+        """Devuelve la entrada de un material. Si no existe se produce un
+        KeyError."""
+
+        self.cargar()
+
+        return self.entradas[nombre]
+
+    def guardar(self, nombre, MAT):
+        """Añade un material a la biblioteca o cambia sus constantes y
+        escribe el archivo.
+
+        INPUTS: nombre = nombre del material
+                MAT    = constantes del material (Material o diccionario)"""
+
+        if not isinstance(MAT, Material):
+            MAT = Material.desde_dict(MAT)
+
+        self.cargar()
+
+        datos = {n: constantes(e.MAT) for n, e in self.entradas.items()}
+        datos[nombre] = constantes(MAT)
+
+        #Se escribe en un archivo temporal y se renombra para no dejar la
+        #biblioteca a medio escribir
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo, indent=4, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+        self.cargar()
+
+###############################################################################
+###############################################################################
+
+def constantes(MAT):
+    """Devuelve el diccionario de constantes de un material que se guarda en
+    la biblioteca (sin las constantes derivadas)."""
+
+    return {nombre: getattr(MAT, nombre) for nombre in CONSTANTES
+            if getattr(MAT, nombre) is not None}
+
+@lru_cache(maxsize=None)
+def biblioteca(ruta=RUTA_BIBLIOTECA):
+    """Devuelve la biblioteca de materiales del archivo indicado. Se crea una
+    sola vez por archivo, de forma que los datos calculados de sus
+    materiales se comparten."""
+
+    return Biblioteca(ruta)
+
+###############################################################################
+###############################################################################
+
+if __name__ == "__main__":
+    #Se calculan las tablas de curvas de iniciacion de todos los materiales
+    #de la biblioteca que aun no estan en la cache
+    for nombre in biblioteca().nombres():
+        print("\n{}".format(nombre))
+        biblioteca()[nombre].precalcular(["SWT", "FS"], ["plana", "eliptica"],
+                                         da=1e-5, W=10e-3, n_procesos=None)
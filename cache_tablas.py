@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Created on:
+
+@author: David García y Alejandro Quirós
+
+Cache en disco de las tablas de curvas de iniciacion en formato binario (ver
+escribir_tabla). Cada tabla se guarda con el nombre del resumen (hash) de todo
+lo que la determina: las constantes del material, el parametro, la geometria
+de la grieta, el paso, el espesor, la malla de la tabla, el modo de calculo
+de la propagacion (en lote o celda a celda) y la version del calculo. Una 
+tabla que ya existe se
+devuelve sin calcular y una tabla nunca se asocia con un material distinto
+del que la genero. Cuando la cache supera un tamaño maximo se eliminan las
+tablas utilizadas hace más tiempo.
+
+Las tablas que se estan calculando se guardan en la cache como puntos de 
+control (clave.parcial.npz) hasta que se terminan. Un calculo interrumpido 
+continua desde su punto de control y una tabla incompleta nunca se devuelve
+como tabla de la cache.
+
+Tambien contiene la superficie de iniciacion evaluada bajo demanda 
+(SuperficieIniciacion), que sustituye a la tabla cuando solo se necesitan los
+puntos de un experimento.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from iniciacion import tabla_iniciacion, escribir_tabla, MALLA_INICIACION
+from iniciacion import EXT_PUNTO_CONTROL
+from iniciacion import fase_iniciacion, ciclos_totales, tension_parametro
+from iniciacion import VERSION_CALCULO
+from propagacion import relacion_ac
+
+RUTA_CACHE = os.path.join("curvas_inic", "cache")
+TAM_MAX    = 200e6          #(bytes) tamaño maximo de la cache
+
+###############################################################################
+###############################################################################
+
+def clave_tabla(par, ac, da, W, MAT, malla=None, lote=True):
+    """Devuelve la clave de una tabla de curvas de iniciacion, el resumen
+    SHA-256 de todos los datos que la determinan.
+
+    INPUTS: par   = parametro para el modelo de iniciacion
+            ac    = plana o eliptica (0 o 0.5)
+            da    = paso para realizar los calculos
+            W     = (m) anchura del especimen
+            MAT   = indice asignado al material
+            malla = definicion de la malla (por defecto MALLA_INICIACION)
+            lote  = modo de calculo de la propagacion (ver 
+                    curvas_iniciacion). Los dos modos no dan exactamente
+                    los mismos ciclos, por lo que sus tablas se guardan por
+                    separado
+
+    OUTPUT: clave = cadena hexadecimal"""
+
+    if malla is None:
+        malla = MALLA_INICIACION
+
+    datos = {"MAT"    : {k: float(v) for k, v in MAT.items()},
+             "par"    : par,
+             "ac"     : float(relacion_ac(ac)),
+             "da"     : float(da),
+             "W"      : float(W),
+             "malla"  : {k: float(v) for k, v in malla.items()},
+             "lote"   : bool(lote),
+             "version": VERSION_CALCULO}
+
+    texto = json.dumps(datos, sort_keys=True)
+
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+###############################################################################
+###############################################################################
+
+def limpiar_cache(ruta_cache=RUTA_CACHE, tam_max=TAM_MAX):
+    """Elimina las tablas utilizadas hace más tiempo hasta que el tamaño de
+    la cache es menor que tam_max. Los puntos de control de las tablas que
+    se estan calculando o se han interrumpido y los archivos temporales de
+    las tablas que se estan escribiendo no se eliminan ni cuentan en el 
+    tamaño.
+
+    INPUTS: ruta_cache = carpeta de la cache
+            tam_max    = (bytes) tamaño maximo de la cache"""
+
+    if not os.path.isdir(ruta_cache):
+        return
+
+    en_uso   = (EXT_PUNTO_CONTROL, ".tmp.npy", ".tmp.npz")
+    archivos = [os.path.join(ruta_cache, f) for f in os.listdir(ruta_cache)
+                if not f.endswith(en_uso)]
+    archivos = [f for f in archivos if os.path.isfile(f)]
+
+    #Las tablas se ordenan de la utilizada hace más tiempo a la más reciente
+    archivos.sort(key=os.path.getmtime)
+    tam = sum(os.path.getsize(f) for f in archivos)
+
+    for f in archivos:
+        if tam <= tam_max:
+            break
+        tam -= os.path.getsize(f)
+        os.remove(f)
+
+###############################################################################
+###############################################################################
+
+def obtener_tablas(par, da, ac, W, MAT, ruta_cache=RUTA_CACHE,
+                   tam_max=TAM_MAX, malla=None, **opciones):
+    """Devuelve las rutas de las tablas de curvas de iniciacion de la cache.
+    Las geometrias cuya tabla no esta en la cache se calculan de una vez con
+    tabla_iniciacion y se guardan.
+
+    INPUTS:  par        = parametro para el modelo de iniciacion
+             da         = paso para realizar los calculos
+             ac         = plana o eliptica (0 o 0.5) o lista de geometrias
+             W          = (m) anchura del especimen
+             MAT        = indice asignado al material
+             ruta_cache = carpeta de la cache
+             tam_max    = (bytes) tamaño maximo de la cache
+             malla      = definicion de la malla (por defecto
+                          MALLA_INICIACION). Puede ser adaptativa (ver 
+                          malla_adaptativa)
+             opciones   = argumentos de tabla_iniciacion (lote, n_procesos,
+                          progreso)
+
+    OUTPUT:  rutas      = diccionario con la ruta de la tabla de cada
+                          geometria o None si se ha cancelado el calculo. 
+                          Solo se devuelven tablas completas"""
+
+    v_ac = list(ac) if isinstance(ac, (list, tuple)) else [ac]
+
+    os.makedirs(ruta_cache, exist_ok=True)
+
+    lote  = opciones.get("lote", True)
+    rutas = {ac_m: os.path.join(ruta_cache,
+                                clave_tabla(par, ac_m, da, W, MAT, malla,
+                                            lote)
+                                + ".npy") for ac_m in v_ac}
+
+    #Las tablas que ya existen se marcan como utilizadas
+    faltan = []
+    for ac_m, ruta in rutas.items():
+        if os.path.isfile(ruta):
+            os.utime(ruta)
+        else:
+            faltan.append(ac_m)
+
+    if faltan:
+        #Con una malla uniforme las geometrias que faltan se calculan de una
+        #vez. La malla adaptativa depende de las geometrias con las que se 
+        #calcula, por lo que cada geometria se calcula por separado para que
+        #la tabla solo dependa de su clave
+        if malla is not None and "tol" in malla:
+            grupos = [[ac_m] for ac_m in faltan]
+        else:
+            grupos = [faltan]
+            
+        for grupo in grupos:
+            #El punto de control de un grupo de geometrias se nombra con 
+            #las claves de todas ellas
+            claves = [os.path.splitext(os.path.basename(rutas[ac_m]))[0]
+                      for ac_m in grupo]
+            if len(claves) > 1:
+                claves = [hashlib.sha256("".join(claves).encode())
+                          .hexdigest()]
+            punto_control = os.path.join(ruta_cache, 
+                                         claves[0] + EXT_PUNTO_CONTROL)
+            
+            tabla = tabla_iniciacion(par, da, grupo, W, MAT, malla=malla,
+                                     punto_control=punto_control, 
+                                     **opciones)
+            #Si se cancela, las filas calculadas quedan en el punto de 
+            #control
+            if tabla is None:
+                return None
+    
+            _, v_param, v_a, N_i = tabla
+            for m, ac_m in enumerate(grupo):
+                #Se escribe en un archivo temporal y se renombra para que 
+                #una tabla a medio escribir nunca aparezca en la cache
+                temporal = rutas[ac_m] + ".tmp.npy"
+                escribir_tabla(temporal, v_param, v_a, N_i[m])
+                os.replace(temporal, rutas[ac_m])
+                
+            os.remove(punto_control)
+
+        limpiar_cache(ruta_cache, tam_max)
+
+    return rutas
+
+###############################################################################
+###############################################################################
+
+class SuperficieIniciacion:
+    """Superficie de ciclos de iniciacion evaluada bajo demanda. Tiene la 
+    misma forma de llamada que la funcion de interpolacion de una tabla 
+    (ver interpolador_tabla), pero en lugar de interpolar calcula N_i con 
+    fase_iniciacion solo en los pares (a, parametro) que se piden, sin error
+    de interpolacion y sin generar la tabla completa.
+    
+    Los resultados se guardan en una memoria LRU de tamaño limitado y, si es
+    persistente, en la cache de tablas con la clave del material, el 
+    parametro, la geometria, el paso y el espesor, de forma que se reutilizan
+    en calculos posteriores."""
+    
+    def __init__(self, par, ac, da, W, MAT, max_puntos=100000, 
+                 persistente=True, ruta_cache=RUTA_CACHE, tam_max=TAM_MAX):
+        """INPUTS: par         = parametro para el modelo de iniciacion
+                   ac          = plana o eliptica (0 o 0.5)
+                   da          = paso para realizar los calculos
+                   W           = (m) anchura del especimen
+                   MAT         = indice asignado al material
+                   max_puntos  = numero maximo de puntos en memoria
+                   persistente = si es True los puntos se guardan en la 
+                                 cache de tablas
+                   ruta_cache  = carpeta de la cache
+                   tam_max     = (bytes) tamaño maximo de la cache"""
+        
+        self.par        = par
+        self.ac         = ac
+        self.da         = da
+        self.W          = W
+        self.MAT        = MAT
+        self.max_puntos = max_puntos
+        self.ruta_cache = ruta_cache
+        self.tam_max    = tam_max
+        self.memoria    = OrderedDict()
+        self.ruta       = None
+        
+        if persistente:
+            clave     = clave_tabla(par, ac, da, W, MAT, {"exacta": 1.0},
+                                    lote=False)
+            self.ruta = os.path.join(ruta_cache, clave + ".npz")
+            if os.path.isfile(self.ruta):
+                self.cargar()
+    
+    def __call__(self, a, param):
+        """Devuelve los ciclos de iniciacion de cada par (a, parametro).
+        
+        INPUTS: a     = (m) vector de tamaños de grieta
+                param = vector de parametros de la misma longitud
+                
+        OUTPUT: N_i   = vector de ciclos de iniciacion"""
+        
+        a     = np.atleast_1d(np.asarray(a, dtype=float))
+        param = np.atleast_1d(np.asarray(param, dtype=float))
+        a, param = np.broadcast_arrays(a, param)
+        
+        claves = list(zip(a.ravel().tolist(), param.ravel().tolist()))
+        faltan = list(dict.fromkeys(c for c in claves 
+                                    if c not in self.memoria))
+        
+        if faltan:
+            self.calcular(faltan)
+        
+        N_i = np.empty(len(claves))
+        for i, c in enumerate(claves):
+            N_i[i] = self.memoria[c]
+            self.memoria.move_to_end(c)
+            
+        self.limitar()
+            
+        return N_i.reshape(a.shape)
+    
+    def calcular(self, puntos):
+        """Calcula con fase_iniciacion los ciclos de iniciacion de una lista
+        de pares (a, parametro) y los guarda."""
+        
+        v_a     = np.array([p[0] for p in puntos])
+        v_param = np.array([p[1] for p in puntos])
+        v_sigma = tension_parametro(self.par, v_param, self.MAT)
+        v_N_t   = np.atleast_1d(ciclos_totales(v_param, self.par, self.MAT))
+        
+        for i, c in enumerate(puntos):
+            self.memoria[c] = fase_iniciacion(v_param[i], v_sigma[i], 
+                                              self.par, v_a[i], self.ac, 
+                                              self.da, self.W, self.MAT, 
+                                              v_N_t[i])
+        
+        if self.ruta is not None:
+            self.limitar()
+            self.guardar()
+    
+    def limitar(self):
+        """Elimina los puntos utilizados hace más tiempo si se supera el 
+        numero maximo de puntos."""
+        
+        while len(self.memoria) > self.max_puntos:
+            self.memoria.popitem(last=False)
+    
+    def guardar(self):
+        """Guarda los puntos en memoria en la cache de tablas."""
+        
+        os.makedirs(self.ruta_cache, exist_ok=True)
+        
+        puntos = np.array(list(self.memoria.keys())).reshape(-1, 2)
+        N_i    = np.array(list(self.memoria.values()))
+        
+        #Se escribe en un archivo temporal y se renombra para que un archivo
+        #a medio escribir nunca aparezca en la cache
+        temporal = self.ruta + ".tmp.npz"
+        np.savez(temporal, a=puntos[:, 0], param=puntos[:, 1], N_i=N_i)
+        os.replace(temporal, self.ruta)
+        
+        limpiar_cache(self.ruta_cache, self.tam_max)
+    
+    def cargar(self):
+        """Carga los puntos guardados en la cache de tablas."""
+        
+        datos = np.load(self.ruta)
+        os.utime(self.ruta)
+        for a, param, N_i in zip(datos["a"], datos["param"], datos["N_i"]):
+            self.memoria[(float(a), float(param))] = float(N_i)
+            
+        self.limitar()
@@ -6,57 +6,120 @@ Created on:
 """
 
 import os
+import json
+import hashlib
 import matplotlib.pyplot as plt
-from scipy.optimize import fsolve
-from propagacion import fase_propagacion,MAT
+from functools import lru_cache
+from scipy.interpolate import RegularGridInterpolator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from propagacion import (fase_propagacion, curvas_propagacion_uniforme,
+                         GrietaDetenida, MAT)
+from material import como_material
 import numpy as np
 import time
 
-def ciclos_totales(param, crit, MAT):
-    """Devuelve los ciclos totales en funcion del criterio usado, utilizando 
-    un fsolve().
+def ciclos_totales(param, crit, MAT, plastico=None):
+    """Devuelve los ciclos totales en funcion del criterio usado invirtiendo
+    la curva de Basquin. El calculo esta vectorizado: param puede ser un 
+    unico valor o un vector.
     
-    INPUTS: param = Fatemi-Socie o Smith-Watson-Topper en un punto 
-            crit  = parametro a utilizar
-            MAT   = indice asignado al material
+    Con y = (2N)^b, el Smith-Watson-Topper es SWT = sigma_f^2/E*y^2, que se 
+    invierte directamente, y el Fatemi-Socie es una ecuacion de segundo grado
+    en y, FS = A*y + B*y^2, de la que se toma la raiz positiva. Si se incluye
+    el termino plastico de Coffin-Manson no hay solucion analitica y se 
+    resuelve con el metodo de Newton en log(2N) para todos los valores a la
+    vez, partiendo de la solucion elastica.
+    
+    INPUTS: param    = Fatemi-Socie o Smith-Watson-Topper (float o ndarray)
+            crit     = parametro a utilizar
+            MAT      = indice asignado al material
+            plastico = si es True se suma el termino plastico de 
+                       Coffin-Manson. Necesita las constantes del material
+                       eps_f (coeficiente de ductilidad) y c (exponente de 
+                       ductilidad). Por defecto (None) se suma si el 
+                       material tiene esas constantes, de forma que las 
+                       tablas, la superficie de iniciacion y principal 
+                       utilizan el termino plastico con los materiales que
+                       lo definen
             
-    OUTPUT: N_t   = ciclos totales"""
+    OUTPUT: N_t      = ciclos totales (float o ndarray)"""
     
     #Constantes del material necesarias 
+    MAT     = como_material(MAT)
     sigma_y = MAT["sigma_y"]
     sigma_f = MAT["sigma_f"]
-    k       = sigma_y/sigma_f
+    k       = MAT.k
     E       = MAT["E"]
     nu      = MAT["nu"]
     b       = MAT["b"]
-
-    def fsolve_FS(x):
-        """Funcion que utiliza el fsolve para calcular los ciclos de vida
-        cuando se utiliza el Fatemi-Socie."""
-        expr = param - ((1+nu)*sigma_f/E*(2.0*x)**b + k/2.0*(1.0 
-                     + nu)*sigma_f**2.0/(E*sigma_y)*(2.0*x)**(2.0*b))
-        
-        return expr
+    
+    param = np.asarray(param, dtype=float)
+    
+    #Solucion elastica (Basquin)
+    if crit == 'FS':
+        A = (1.0 + nu)*sigma_f/E
+        B = k/2.0*(1.0 + nu)*sigma_f**2.0/(E*sigma_y)
+        y = 2.0*param/(A + np.sqrt(A**2.0 + 4.0*B*param))
+    
+    elif crit == 'SWT':
+        y = (param*E/sigma_f**2.0)**0.5
         
-    def fsolve_SWT(x):
-        """Funcion que utiliza el fsolve para calcular los ciclos de vida
-        cuando se utiliza el Smith-Watson-Topper."""        
-        expr = param - (sigma_f**2.0/E*(2*x)**(2.0*b))
+    else:
+        raise ValueError("Parametro de iniciacion desconocido: {}".format(
+                         crit))
+    
+    with np.errstate(divide='ignore'):
+        L = np.log(y)/b                    #L = log(2N)
+    
+    #Termino plastico de Coffin-Manson
+    if plastico is None:
+        plastico = "eps_f" in MAT and "c" in MAT
+    if plastico:
+        if "eps_f" not in MAT or "c" not in MAT:
+            raise ValueError("El termino plastico necesita las constantes "
+                             "eps_f y c del material")
+        eps_f = MAT["eps_f"]
+        c     = MAT["c"]
         
-        return expr
+        def residuo(L):
+            """Devuelve el residuo de la curva de vida y su derivada 
+            respecto de L"""
+            y = np.exp(b*L)
+            z = np.exp(c*L)
+            if crit == 'FS':
+                #Deformacion angular con coeficiente de Poisson plastico 0.5
+                gamma   = (1.0 + nu)*sigma_f/E*y + 1.5*eps_f*z
+                d_gamma = (1.0 + nu)*sigma_f/E*b*y + 1.5*eps_f*c*z
+                s_n     = 1.0 + k*sigma_f*y/(2.0*sigma_y)
+                d_s_n   = k*sigma_f*b*y/(2.0*sigma_y)
+                f       = gamma*s_n
+                df      = d_gamma*s_n + gamma*d_s_n
+            else:
+                f  = sigma_f**2.0/E*y**2.0 + sigma_f*eps_f*y*z
+                df = 2.0*b*sigma_f**2.0/E*y**2.0 + (b + c)*sigma_f*eps_f*y*z
+            return f - param, df
         
-    if crit == 'FS':        
-        N_t = fsolve(func=fsolve_FS, x0=10, xtol=1e-10)[0]
+        #La curva de vida es convexa y decreciente en L y la solucion 
+        #elastica queda por debajo de la raiz, por lo que Newton converge 
+        #de forma monotona
+        for _ in range(50):
+            f, df = residuo(L)
+            paso  = np.where(np.isfinite(L), f/df, 0.0)
+            L     = L - paso
+            if np.all(np.abs(paso) < 1e-12):
+                break
     
-    elif crit == 'SWT':
-        N_t = fsolve(func=fsolve_SWT, x0=100, xtol=1e-10)[0]
+    N_t = np.exp(L)/2.0
+    
+    if N_t.ndim == 0:
+        N_t = float(N_t)
     
     return N_t
     
 ###############################################################################
 ###############################################################################
 
-def fase_iniciacion(param, sigma, crit, a_i,ac, da, W, MAT):
+def fase_iniciacion(param, sigma, crit, a_i,ac, da, W, MAT, N_t=None):
     """Devuelve los ciclos de la fase de iniciacion de una grieta, conocida
     la tension media desde la superficie hasta la punta de la misma.
     
@@ -64,15 +127,19 @@ def fase_iniciacion(param, sigma, crit, a_i,ac, da, W, MAT):
             sigma = tension x en ese punto
             crit  = parametro a utilizar
             a_i   = (m) tamaño de la grieta de iniciacion
-            ac    = plana o eliptica (0 o 0.5)
+            ac    = plana o eliptica (0 o 0.5) o lista de geometrias
             da    = paso para realizar los calculos 
             W     = (m) anchura del especimen
             MAT   = indice asignado del material
+            N_t   = ciclos totales, si ya se han calculado (ver 
+                    ciclos_totales)
                   
-    OUTPUT: N_i   = ciclos de la fase de iniciacion"""
+    OUTPUT: N_i   = ciclos de la fase de iniciacion. Con una lista de 
+                    geometrias, lista con los ciclos de cada una"""
     
     #Calcula los ciclos totales hasta el fallo
-    N_t = ciclos_totales(param, crit, MAT)
+    if N_t is None:
+        N_t = ciclos_totales(param, crit, MAT)
     
     #ind_a se utiliza para la propia fase de propagacion por lo 
     #que en la fase de iniciacion no es una variable relevante y puede tomar 
@@ -82,8 +149,31 @@ def fase_iniciacion(param, sigma, crit, a_i,ac, da, W, MAT):
     #Calculos los ciclos que necesita la grieta para propagarse
     N_p = fase_propagacion(sigma, ind_a, a_i,ac, da, W, MAT)
     
-    #Calculamos los ciclos de iniciacion
-    N_i = N_t - N_p
+    #Con varias geometrias la propagacion se ha calculado de una vez y se 
+    #obtienen los ciclos de iniciacion de cada una
+    if isinstance(N_p, list):
+        return [ciclos_iniciacion_fase(N_t, n_p) for n_p in N_p]
+    
+    return ciclos_iniciacion_fase(N_t, N_p)
+
+###############################################################################
+###############################################################################
+
+def ciclos_iniciacion_fase(N_t, N_p):
+    """Devuelve los ciclos de iniciacion conocidos los ciclos totales y los
+    de propagacion.
+    
+    INPUTS: N_t = ciclos totales
+            N_p = ciclos de la fase de propagacion
+            
+    OUTPUT: N_i = ciclos de la fase de iniciacion"""
+    
+    #Calculamos los ciclos de iniciacion. Si la grieta se detiene antes de
+    #romper no hay fase de propagacion y toda la vida es de iniciacion
+    if isinstance(N_p, GrietaDetenida):
+        N_i = N_t
+    else:
+        N_i = N_t - N_p
     
     #Si el numero es negativo devuelve 0
     if N_i < 0:
@@ -99,104 +189,815 @@ def fase_iniciacion(param, sigma, crit, a_i,ac, da, W, MAT):
 ###############################################################################
 ############################################################################### 
     
-def curvas_iniciacion(par, da,ac, W, MAT):
-    """Escribe un archivo de texto con las curvas de
-    iniciación para distintas longitudes de grieta para un material.
-    
-    INPUT:   par   = parametro para el modelo de iniciacion
-             ac      =plana o eliptica (0 o 0.5)
-             da    = paso para realizar los calculos 
-             W     = (m) anchura del especimen
-             MAT   = indice asignado al material
-        
-    OUTPUTS: MATX_par.dat = archivo con las curvas de iniciacion
-             figura.png   = imagen con las curvas de iniciacion"""
-             
-    print(('\nCurvas de iniciacion del material '
-           +'utilizando el parametro {}\n').format(par))
+#Version del calculo de las tablas. Debe cambiarse cuando se modifique el
+#calculo de las curvas de iniciacion para invalidar las tablas guardadas y
+#los puntos de control (ver cache_tablas y firma_calculo)
+VERSION_CALCULO = "2"
+
+#Definicion de la malla de las tablas de curvas de iniciacion
+MALLA_INICIACION = {"sigma_min"   : 50.0,    #(MPa) tension minima
+                    "sigma_max"   : 500.0,   #(MPa) tension maxima
+                    "delta_sigma" : 10.0,    #(MPa) paso de tensiones
+                    "n_a"         : 100,     #Número de curvas de iniciacion
+                    "a_min"       : 5e-5,    #(m) tamaño más pequeño grieta
+                    "ex"          : 1.2}     #Variable para controlar como 
+                                             #crece la diferencia entre 
+                                             #longitudes de grieta
+
+#Definicion de una malla adaptativa (ver malla_adaptativa). La malla inicial
+#es uniforme en tension y geometrica en tamaño de grieta y se refina hasta
+#que el error de log10(N_i) de la interpolacion de la tabla es menor que tol
+MALLA_ADAPTATIVA = {"sigma_min" : 50.0,     #(MPa) tension minima
+                    "sigma_max" : 490.0,    #(MPa) tension maxima
+                    "n_sigma"   : 10,       #Tensiones de la malla inicial
+                    "a_min"     : 5e-5,     #(m) tamaño más pequeño grieta
+                    "a_max"     : 1.25e-2,  #(m) tamaño más grande grieta
+                    "n_a"       : 10,       #Tamaños de la malla inicial
+                    "tol"       : 0.01,     #Error admisible de log10(N_i)
+                    "ds_min"    : 4.0,      #(MPa) intervalo minimo de 
+                                            #tension
+                    "ra_min"    : 1.1,      #Relacion minima entre tamaños
+                                            #consecutivos
+                    "n_niveles" : 8}        #Niveles maximos de refinamiento
+
+###############################################################################
+###############################################################################
+
+def parametro_tension(par, v_sigma, MAT):
+    """Devuelve el Fatemi-Socie o el Smith-Watson-Topper de un estado de 
+    tension uniaxial.
     
-    #Abrimos el archivo donde se van a escribir los datos,
-    #escribimos la cabecera del mismo y creamos los vectores con las tensiones
-    #y los tamaños de grieta para crear las curvas de iniciación
-    cwd      = os.getcwd()
-    ruta     = cwd + '/curvas_inic/{}/'.format(ac)
-    ruta_fig = cwd + '/grafs/{}/'.format(ac)
-    if(os.path.isdir(ruta_fig)):
-        pass
-    else:
-        os.mkdir(ruta_fig)
+    INPUTS: par     = parametro para el modelo de iniciacion
+            v_sigma = (MPa) vector de tensiones
+            MAT     = indice asignado al material
+            
+    OUTPUT: v_param = vector de Fatemi-Socie o Smith-Watson-Topper"""
 
-    archivo  = open('{}/MAT_{}.dat'.format(ruta, par), 'w')
-        
-    archivo.write('{:.3e} '.format(0.0000))
+    #Cargamos propiedades del material
+    MAT     = como_material(MAT)
+    sigma_y = MAT["sigma_y"]
+    k       = MAT.k
+    E       = MAT["E"]
+    G       = MAT["G"]
     
-    v_sigma     = []       #Vector de tensiones
-    v_param     = []       #Vector de Fatemi-Socie o Smith-Watson-Topper
-    n_sigma     = 45          #Discretizaciones de la curva de iniciacion
+    v_sigma = np.asarray(v_sigma, dtype=float)
+    v_def   = v_sigma/E 
+    v_gamma = v_sigma/2/G 
+    v_param = v_gamma*(1.0+k*v_sigma/2.0/sigma_y) if par =='FS' else v_sigma*v_def
     
-    sigma_max   = 500.0    #(MPa) tension maxima
-    sigma_min   = 50.0     #(MPa) tension minima
-        
-    delta_sigma = 10.0      #Paso de tensiones
+    return v_param
 
-    #Cargamos propiedades del material
+###############################################################################
+###############################################################################
+
+def tension_parametro(par, v_param, MAT):
+    """Devuelve la tension uniaxial asociada a un Fatemi-Socie o un 
+    Smith-Watson-Topper, inversa de parametro_tension.
+    
+    INPUTS: par     = parametro para el modelo de iniciacion
+            v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+            MAT     = indice asignado al material
+            
+    OUTPUT: v_sigma = (MPa) vector de tensiones"""
+    
+    MAT     = como_material(MAT)
     sigma_y = MAT["sigma_y"]
-    sigma_f = MAT["sigma_f"]
-    k       = sigma_y/sigma_f
+    k       = MAT.k
     E       = MAT["E"]
     G       = MAT["G"]
+    
+    v_param = np.asarray(v_param, dtype=float)
+    
+    if par == 'FS':
+        #FS = sigma/(2G) + k/(4G*sigma_y)*sigma^2, raiz positiva
+        A = 1.0/(2.0*G)
+        B = k/(4.0*G*sigma_y)
+        return 2.0*v_param/(A + np.sqrt(A**2.0 + 4.0*B*v_param))
+    
+    return np.sqrt(v_param*E)
+
+###############################################################################
+###############################################################################
+
+def malla_iniciacion(par, MAT, malla=None):
+    """Devuelve los vectores de tensiones, parametros y tamaños de grieta de
+    una tabla de curvas de iniciacion.
+    
+    INPUTS:  par     = parametro para el modelo de iniciacion
+             MAT     = indice asignado al material
+             malla   = definicion de la malla (por defecto MALLA_INICIACION)
+             
+    OUTPUTS: v_sigma = (MPa) vector de tensiones
+             v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+             v_a     = (m) vector de tamaños de grietas"""
+    
+    if malla is None:
+        malla = MALLA_INICIACION
 
     #Generamos el vector de Fatemi-Socie o Smith-Watson-Topper
-         
-    v_sigma = np.arange(sigma_min,sigma_max,delta_sigma)
-    n_sigma = len(v_sigma)
-    v_def = v_sigma/E 
-    v_gamma = v_sigma/2/G 
-    v_param = v_gamma*(1.0+k*v_sigma/2.0/sigma_y) if par =='FS' else v_sigma*v_def
-                                    
-    n_a   = 100        #Número de curvas de iniciacion por material
-    a_min = 5e-5           #Tamaño más pequeño grieta
-    ex    = 1.2		   #Variable para controlar como crece la diferencia
-    					   #entre longitudes de grieta
-       
-    v_a = [a_min*(i+1.0)**ex for i in range(n_a)] #Vector de tamaños de grietas
-    for a in v_a:
-        archivo.write('{:.3e} '.format(a))
+    v_sigma = np.arange(malla["sigma_min"], malla["sigma_max"], 
+                        malla["delta_sigma"])
+    v_param = parametro_tension(par, v_sigma, MAT)
+    
+    #Vector de tamaños de grietas
+    v_a = [malla["a_min"]*(i+1.0)**malla["ex"] for i in range(malla["n_a"])] 
+    
+    return v_sigma, v_param, v_a
 
-    N_i = np.zeros((n_sigma,n_a)) #inicializamos la matriz de ciclos de iniciación
+###############################################################################
+###############################################################################
 
-    # proceso = 0.0
-    t1 = time.time()
+def escribir_tabla(ruta, v_param, v_a, N_i):
+    """Escribe el archivo de una tabla de curvas de iniciacion. La tabla es 
+    una matriz con los tamaños de grieta en la primera fila, los valores del
+    parametro en la primera columna y los ciclos de iniciacion en el resto.
+    
+    El formato depende de la extension de la ruta:
+        .npy --> binario de NumPy en doble precision. Se puede leer con 
+                 np.load(ruta, mmap_mode='r') sin copiar los datos 
+                 (ver leer_tabla)
+        otra --> texto con tres cifras significativas, como las tablas 
+                 antiguas
+    
+    INPUTS: ruta    = ruta del archivo
+            v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+            v_a     = (m) vector de tamaños de grietas
+            N_i     = matriz (parametro, tamaño) de ciclos de iniciacion"""
+    
+    if os.path.splitext(ruta)[1] == ".npy":
+        tabla = np.zeros((len(v_param) + 1, len(v_a) + 1))
+        tabla[0, 1:]  = v_a
+        tabla[1:, 0]  = v_param
+        tabla[1:, 1:] = N_i
+        
+        #Se escribe con el objeto archivo para que np.save no añada la 
+        #extension a las rutas temporales
+        with open(ruta, 'wb') as archivo:
+            np.save(archivo, tabla)
+        return
+    
+    archivo  = open(ruta, 'w')
+    archivo.write('{:.3e} '.format(0.0000))
+    for a in v_a:
+        archivo.write('{:.3e} '.format(a))
     for i in range(len(v_param)):
         archivo.write('\n{:.3e} '.format(v_param[i]))
-        for j,a in enumerate(v_a):
-            N_i[i,j]  = fase_iniciacion(v_param[i], v_sigma[i], par, a,ac, da, W, MAT)
+        for j in range(len(v_a)):
             archivo.write('{:.3e} '.format(N_i[i,j]))
-        #Pintamos en la consola el porcentaje realizado
-        print('\r{:.2%} completado'.format((i+1.0)/len(v_param)), end = '')
-        # proceso =(i+1.0)/len(v_param)
-        # return proceso
     #Cerramos el archivo
-    
     archivo.close()   
+
+###############################################################################
+###############################################################################
+
+def leer_tabla(ruta, mmap=True):
+    """Lee una tabla de curvas de iniciacion escrita con escribir_tabla. Las
+    tablas binarias se proyectan en memoria (np.load con mmap_mode='r'), de
+    forma que los vectores devueltos son vistas de solo lectura del archivo y
+    varios procesos pueden leer la misma tabla sin copiarla.
+    
+    INPUTS:  ruta    = ruta del archivo (.npy o texto)
+             mmap    = si es False la tabla binaria se carga en memoria
+             
+    OUTPUTS: v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+             v_a     = (m) vector de tamaños de grietas
+             N_i     = matriz (parametro, tamaño) de ciclos de iniciacion
+             
+    Los puntos de control de tablas sin terminar no se pueden leer como 
+    tablas y dan el error TablaIncompleta (ver leer_punto_control)"""
+    
+    if ruta.endswith(EXT_PUNTO_CONTROL):
+        completado = leer_punto_control(ruta)[3]
+        raise TablaIncompleta("La tabla {} esta incompleta ({:.2%} "
+                              "calculado)".format(ruta, completado))
+    
+    if os.path.splitext(ruta)[1] == ".npy":
+        tabla = np.load(ruta, mmap_mode='r' if mmap else None)
+    else:
+        tabla = np.loadtxt(ruta)
+        
+    return tabla[1:, 0], tabla[0, 1:], tabla[1:, 1:]
+
+###############################################################################
+###############################################################################
+
+def interpolador_tabla(ruta, metodo="linear"):
+    """Devuelve la funcion de interpolacion de una tabla de curvas de 
+    iniciacion. Se construye una sola vez por tabla: las siguientes llamadas
+    con la misma ruta devuelven la misma funcion mientras el archivo no 
+    cambie.
+    
+    La interpolacion se realiza en funcion del parametro y de log(a), sobre
+    log10(N_i) salvo en las celdas de la tabla con algun nodo nulo y en sus
+    vecinas, en las que se interpola sobre N_i. Cerca de los nodos nulos N_i
+    cae a 0 (la propagacion agota la vida total) de forma aproximadamente 
+    lineal y el logaritmo de un ciclo en el nodo nulo arrastraria hacia 0 
+    toda la celda. Fuera de la tabla se toma el valor del borde más cercano
+    y los ciclos menores que un ciclo se toman como 0.
+    
+    INPUTS: ruta   = ruta de la tabla (ver leer_tabla)
+            metodo = metodo de RegularGridInterpolator ("linear" o "cubic")
+            
+    OUTPUT: interp = funcion interp(a, param) que devuelve los ciclos de 
+                     iniciacion para vectores de tamaños de grieta (m) y de
+                     parametros de la misma longitud"""
+    
+    return interpolador_archivo(ruta, os.stat(ruta).st_mtime_ns, metodo)
+
+def celdas_lineales(nulo):
+    """Devuelve las celdas de una tabla de curvas de iniciacion que se 
+    interpolan sobre N_i en lugar de sobre log10(N_i) (ver 
+    interpolador_tabla): las celdas con algun nodo nulo y sus vecinas. Un 
+    nodo esta cerca de un nodo nulo si esta a un paso o menos de él, y una 
+    celda es lineal si alguno de sus nodos esta cerca.
+    
+    INPUT:  nulo   = matriz (parametro, tamaño) que indica los nodos con 
+                     menos de un ciclo
+                     
+    OUTPUT: lineal = matriz (parametro - 1, tamaño - 1) que indica las 
+                     celdas lineales"""
+    
+    cerca = np.pad(nulo, 1)
+    cerca = cerca[:-2] | cerca[1:-1] | cerca[2:]
+    cerca = cerca[:, :-2] | cerca[:, 1:-1] | cerca[:, 2:]
+    
+    return cerca[:-1, :-1] | cerca[1:, :-1] | cerca[:-1, 1:] | cerca[1:, 1:]
+
+@lru_cache(maxsize=32)
+def interpolador_archivo(ruta, version, metodo):
+    """Construye la funcion de interpolacion de interpolador_tabla. version
+    es la fecha de modificacion del archivo, que forma parte de la clave de
+    la memoria."""
+    
+    v_param, v_a, N_i = leer_tabla(ruta, mmap=False)
+    
+    log_a      = np.log(v_a)
+    interp_log = RegularGridInterpolator((v_param, log_a), 
+                                         np.log10(np.maximum(N_i, 1.0)), 
+                                         method=metodo)
+    interp_lin = RegularGridInterpolator((v_param, log_a), N_i, 
+                                         method=metodo)
+    
+    #Celdas que se interpolan sobre N_i
+    lineal = celdas_lineales(N_i < 1.0)
+    
+    def function_interp(a, param):
+        """Ciclos de iniciacion interpolados en la tabla"""
+        a     = np.asarray(a, dtype=float)
+        param = np.asarray(param, dtype=float)
+        
+        #Extrapolacion con el valor del borde más cercano
+        p      = np.clip(param, v_param[0], v_param[-1])
+        l_a    = np.clip(np.log(a), log_a[0], log_a[-1])
+        puntos = np.stack((p, l_a), axis=-1)
+        
+        #Celda de la tabla de cada punto
+        i = np.clip(np.searchsorted(v_param, p, side='right') - 1, 0, 
+                    len(v_param) - 2)
+        j = np.clip(np.searchsorted(log_a, l_a, side='right') - 1, 0, 
+                    len(log_a) - 2)
+        
+        N = np.where(lineal[i, j], interp_lin(puntos), 
+                     10.0**interp_log(puntos))
+        
+        #Los ciclos menores que uno son 0
+        return np.where(N > 1.0, N, 0.0)
+    
+    return function_interp
+
+###############################################################################
+###############################################################################
+
+#Extension de los puntos de control de las tablas que se estan calculando
+EXT_PUNTO_CONTROL = ".parcial.npz"
+
+class TablaIncompleta(ValueError):
+    """Error al utilizar como tabla de curvas de iniciacion el punto de 
+    control de una tabla que no se ha terminado de calcular."""
+
+###############################################################################
+###############################################################################
+
+def firma_calculo(par, da, v_ac, W, MAT, malla, lote):
+    """Devuelve el resumen (SHA-256) de los datos de un calculo de tablas de
+    curvas de iniciacion. Un punto de control solo se reanuda si se ha 
+    guardado con la misma firma.
+    
+    INPUTS: par, da, v_ac, W, MAT, malla, lote = ver tabla_iniciacion
+    
+    OUTPUT: firma = cadena hexadecimal"""
+    
+    datos = {"par"    : par,
+             "da"     : float(da),
+             "ac"     : [str(ac) for ac in v_ac],
+             "W"      : float(W),
+             "MAT"    : {k: float(v) for k, v in MAT.items()},
+             "malla"  : {k: float(v) for k, v in malla.items()},
+             "lote"   : bool(lote),
+             "version": VERSION_CALCULO}
+    
+    texto = json.dumps(datos, sort_keys=True)
+    
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+###############################################################################
+###############################################################################
+
+def guardar_punto_control(ruta, **datos):
+    """Guarda el estado de un calculo de tablas en un punto de control. Se 
+    escribe en un archivo temporal y se renombra, de forma que si el calculo
+    se interrumpe queda siempre el ultimo punto de control completo.
+    
+    INPUTS: ruta  = ruta del punto de control (terminada en 
+                    EXT_PUNTO_CONTROL)
+            datos = vectores del estado del calculo"""
+    
+    temporal = ruta + ".tmp.npz"
+    with open(temporal, 'wb') as archivo:
+        np.savez(archivo, **datos)
+    os.replace(temporal, ruta)
+
+def cargar_punto_control(ruta, firma):
+    """Devuelve el estado guardado en un punto de control si existe y se ha
+    guardado con la misma firma (ver firma_calculo). En otro caso devuelve 
+    None y el calculo empieza desde el principio."""
+    
+    if ruta is None or not os.path.isfile(ruta):
+        return None
+    
+    with np.load(ruta) as datos:
+        if str(datos["firma"]) != firma:
+            return None
+        return {k: datos[k] for k in datos.files}
+
+def leer_punto_control(ruta):
+    """Lee la tabla incompleta guardada en un punto de control.
+    
+    INPUTS:  ruta       = ruta del punto de control
+    
+    OUTPUTS: v_param    = vector de Fatemi-Socie o Smith-Watson-Topper
+             v_a        = (m) vector de tamaños de grietas
+             N_i        = matriz (geometria, parametro, tamaño) de ciclos de
+                          iniciacion. En una malla uniforme las filas que 
+                          faltan son nan. En una malla adaptativa es la 
+                          tabla del ultimo nivel terminado
+             completado = fraccion del calculo realizada"""
+    
+    with np.load(ruta) as datos:
+        if "completas" in datos.files:
+            N_i = np.where(datos["completas"][None, :, None], datos["N_i"], 
+                           np.nan)
+            return (datos["v_param"], datos["v_a"], N_i, 
+                    float(np.mean(datos["completas"])))
+        
+        log_N = datos["log_N"]
+        N_i   = np.where(log_N > 0.0, 10.0**log_N, 0.0)
+        return (datos["v_param"], datos["v_a"], N_i, 
+                float(datos["nivel"])/float(datos["n_niveles"]))
+
+###############################################################################
+###############################################################################
+
+def progreso_consola(completado):
+    """Pinta en la consola el porcentaje realizado de las curvas de 
+    iniciacion. Es la funcion de progreso por defecto de curvas_iniciacion.
+    
+    INPUT:  completado = fraccion de filas de la tabla calculadas"""
+    
+    print('\r{:.2%} completado'.format(completado), end = '')
+    
+###############################################################################
+###############################################################################
+
+def filas_iniciacion(filas, par, v_param, v_sigma, v_a, v_ac, v_N_t, da, W,
+                     MAT, lote=True):
+    """Devuelve los ciclos de iniciacion de un grupo de filas de la tabla de
+    curvas de iniciacion. Es la tarea que se reparte entre los procesos en 
+    curvas_iniciacion.
+    
+    INPUTS: filas   = indices de las filas (tensiones) a calcular
+            par     = parametro para el modelo de iniciacion
+            v_param = vector de FS o SWT de cada tension
+            v_sigma = (MPa) vector de tensiones de la tabla
+            v_a     = (m) vector de longitudes de grieta de la tabla
+            v_ac    = lista de geometrias
+            v_N_t   = vector de ciclos totales de cada tension
+            da      = paso para realizar los calculos 
+            W       = (m) anchura del especimen
+            MAT     = indice asignado al material
+            lote    = ver curvas_iniciacion
+            
+    OUTPUT: N_i     = matriz (geometria, fila, longitud) de ciclos de 
+                      iniciacion"""
+    
+    v_param = np.asarray(v_param)[filas]
+    v_sigma = np.asarray(v_sigma)[filas]
+    v_N_t   = np.asarray(v_N_t)[filas]
+    
+    if lote:
+        #Todas las tensiones y geometrias avanzan a la vez y los ciclos de 
+        #propagacion de todas las longitudes se leen de cada trayectoria
+        N_p = curvas_propagacion_uniforme(v_sigma, v_a, v_ac, da, W, MAT)
+        N_t = v_N_t[None, :, None]
+        
+        #Mismas reglas que ciclos_iniciacion_fase
+        N_i = np.where(np.isinf(N_p), N_t, np.maximum(N_t - N_p, 0.0))
+        N_i = np.where(N_t > 1.5e7, N_t, N_i)
+    else:
+        N_i = np.zeros((len(v_ac), len(v_sigma), len(v_a)))
+        for i in range(len(v_sigma)):
+            for j,a in enumerate(v_a):
+                N_i[:,i,j] = fase_iniciacion(v_param[i], v_sigma[i], par, a,
+                                             v_ac, da, W, MAT, v_N_t[i])
+                
+    return N_i
+
+###############################################################################
+###############################################################################
+
+def tabla_iniciacion(par, da, v_ac, W, MAT, lote=True, n_procesos=1, 
+                     progreso=None, malla=None, punto_control=None):
+    """Calcula las tablas de curvas de iniciacion de varias geometrias sin 
+    escribir ningun archivo de tabla.
+    
+    Si se indica un punto de control, cada fila terminada se guarda en él y,
+    si el calculo se interrumpe o se cancela, al repetirlo con los mismos 
+    datos se continua desde las filas ya calculadas. El punto de control no
+    se borra al terminar: lo borra quien escribe la tabla, una vez escrita.
+    
+    INPUTS:  par, da, W, MAT, lote, n_procesos, progreso = ver 
+                       curvas_iniciacion
+             v_ac    = lista de geometrias
+             malla   = definicion de la malla. Si contiene la tolerancia 
+                       "tol" la malla es adaptativa (ver malla_adaptativa)
+             punto_control = ruta del punto de control (terminada en 
+                       EXT_PUNTO_CONTROL) o None
+             
+    OUTPUTS: v_sigma = (MPa) vector de tensiones
+             v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+             v_a     = (m) vector de tamaños de grietas
+             N_i     = matriz (geometria, parametro, tamaño) de ciclos de 
+                       iniciacion
+             Si se cancela el calculo se devuelve None"""
+    
+    if progreso is None:
+        progreso = progreso_consola
+    
+    if malla is not None and "tol" in malla:
+        return malla_adaptativa(par, da, v_ac, W, MAT, malla, lote, progreso,
+                                punto_control)
+    
+    if malla is None:
+        malla = MALLA_INICIACION
+    
+    #Creamos los vectores con las tensiones y los tamaños de grieta para 
+    #crear las curvas de iniciación
+    v_sigma, v_param, v_a = malla_iniciacion(par, MAT, malla)
+    n_sigma = len(v_sigma)
+    n_a     = len(v_a)
+
+    #Los ciclos totales solo dependen del parametro y se calculan de una vez
+    v_N_t = ciclos_totales(v_param, par, MAT)
+
+    #Cada fila de la tabla (un valor del parametro) es una tarea 
+    #independiente. Con varios procesos las filas se reparten entre ellos y
+    #la tabla se ensambla en orden segun van terminando
+    N_i       = np.zeros((len(v_ac),n_sigma,n_a)) 
+    completas = np.zeros(n_sigma, dtype=bool)
+    datos     = (par, v_param, v_sigma, v_a, v_ac, v_N_t, da, W, MAT, lote)
+    
+    #Filas calculadas en un calculo anterior interrumpido
+    firma  = firma_calculo(par, da, v_ac, W, MAT, malla, lote)
+    previo = cargar_punto_control(punto_control, firma)
+    if previo is not None:
+        N_i       = previo["N_i"]
+        completas = previo["completas"]
+        
+    def anotar(i, N_fila):
+        """Añade una fila terminada a la tabla y al punto de control y 
+        devuelve lo que devuelve la funcion de progreso"""
+        N_i[:, [i], :] = N_fila
+        completas[i]   = True
+        if punto_control is not None:
+            guardar_punto_control(punto_control, firma=firma, 
+                                  v_param=v_param, v_a=v_a, N_i=N_i, 
+                                  completas=completas)
+        return progreso(np.mean(completas))
+    
+    pendientes = np.flatnonzero(~completas)
+    
+    if n_procesos == 1:
+        for i in pendientes:
+            if anotar(i, filas_iniciacion([i], *datos)) is False:
+                return None
+    elif len(pendientes) > 0:
+        pool = ProcessPoolExecutor(max_workers=n_procesos)
+        tareas = {pool.submit(filas_iniciacion, [i], *datos): i 
+                  for i in pendientes}
+        for tarea in as_completed(tareas):
+            if anotar(tareas[tarea], tarea.result()) is False:
+                pool.shutdown(wait=False, cancel_futures=True)
+                return None
+        pool.shutdown()
+        
+    return v_sigma, v_param, np.asarray(v_a), N_i
+
+###############################################################################
+###############################################################################
+
+def error_interpolacion(log_N_med, log_N_0, log_N_1, lineal):
+    """Devuelve el error de log10(N_i) de la interpolacion de la tabla (ver 
+    interpolador_tabla) en el punto medio de un intervalo entre dos nodos.
+    En las celdas lineales se interpola N_i y en el resto log10(N_i).
+    
+    INPUTS: log_N_med = log10(N_i) calculado en los puntos medios
+            log_N_0   = log10(N_i) en el primer nodo de cada intervalo
+            log_N_1   = log10(N_i) en el segundo nodo de cada intervalo
+            lineal    = celda lineal de cada intervalo (ver celdas_lineales)
+            
+    OUTPUT: error     = error absoluto de log10(N_i) de la interpolacion"""
+    
+    #Los nodos nulos se guardan como log10(1) = 0 
+    N_lin  = (np.where(log_N_0 > 0.0, 10.0**log_N_0, 0.0)
+              + np.where(log_N_1 > 0.0, 10.0**log_N_1, 0.0))/2.0
+    interp = np.where(lineal, np.log10(np.maximum(N_lin, 1.0)), 
+                      (log_N_0 + log_N_1)/2.0)
+    
+    return np.abs(log_N_med - interp)
+
+###############################################################################
+###############################################################################
+
+def malla_adaptativa(par, da, v_ac, W, MAT, malla=None, lote=True, 
+                     progreso=None, punto_control=None):
+    """Calcula una tabla de curvas de iniciacion en una malla no uniforme que
+    se refina hasta que la interpolacion de la tabla entre nodos (ver 
+    interpolador_tabla) tiene un error de log10(N_i) menor que la 
+    tolerancia.
+    
+    Se parte de una malla uniforme en tension y geometrica en tamaño de 
+    grieta. En cada nivel se calcula el punto medio, en las coordenadas del
+    interpolador, de los intervalos de parametro (y de log(a)) que aun no 
+    han convergido y se compara log10(N_i) con el valor interpolado entre 
+    los nodos del intervalo (ver error_interpolacion). Los intervalos con un
+    error mayor que la tolerancia se dividen en dos y el resto se dan por 
+    convergidos. Los saltos de N_i (grietas que se detienen
+    o el limite de 1.5e7 ciclos de fase_iniciacion) no se pueden resolver
+    refinando, por lo que los intervalos no se dividen por debajo de un 
+    ancho minimo. La tabla sigue siendo rectangular, por lo 
+    que cada tension añadida se calcula para todos los tamaños y viceversa.
+    
+    INPUTS:  par     = parametro para el modelo de iniciacion
+             da      = paso para realizar los calculos 
+             v_ac    = lista de geometrias
+             W       = (m) anchura del especimen
+             MAT     = indice asignado al material
+             malla   = definicion de la malla (por defecto MALLA_ADAPTATIVA)
+             lote    = ver curvas_iniciacion
+             progreso = funcion progreso(completado) a la que se llama al 
+                        terminar cada nivel. Si devuelve False se cancela el
+                        calculo y se devuelve None
+             punto_control = ruta del punto de control. La malla se guarda
+                        al terminar cada nivel y el calculo se reanuda desde
+                        el ultimo nivel terminado (ver tabla_iniciacion)
+             
+    OUTPUTS: v_sigma = (MPa) vector de tensiones
+             v_param = vector de Fatemi-Socie o Smith-Watson-Topper
+             v_a     = (m) vector de tamaños de grietas
+             N_i     = matriz (geometria, parametro, tamaño) de ciclos de 
+                       iniciacion"""
+    
+    if malla is None:
+        malla = MALLA_ADAPTATIVA
+    if progreso is None:
+        progreso = progreso_consola
+        
+    tol = malla["tol"]
+    
+    def evaluar(v_sigma, v_a):
+        """Devuelve log10(N_i) en todos los nodos de una submalla"""
+        v_param = parametro_tension(par, v_sigma, MAT)
+        v_N_t   = ciclos_totales(v_param, par, MAT)
+        N_i     = filas_iniciacion(np.arange(len(v_sigma)), par, v_param,
+                                   v_sigma, v_a, v_ac, v_N_t, da, W, MAT, 
+                                   lote)
+        #Los ciclos nulos se toman como un ciclo para poder tomar el 
+        #logaritmo
+        return np.log10(np.maximum(N_i, 1.0))
+    
+    def lineales():
+        """Devuelve las celdas de la malla actual que el interpolador trata
+        sobre N_i (ver celdas_lineales), para cada geometria"""
+        return np.array([celdas_lineales(log_N_m <= 0.0) 
+                         for log_N_m in log_N])
+    
+    def insertar(v, log_N, v_med, log_N_med, activos, refinar, eje):
+        """Inserta en la malla los puntos medios de los intervalos que se
+        refinan. Devuelve la malla, log10(N_i) y los intervalos activos"""
+        ind     = np.flatnonzero(activos)[refinar]
+        v       = np.insert(v, ind + 1, v_med[refinar])
+        log_N   = np.insert(log_N, ind + 1, np.take(log_N_med, 
+                            np.flatnonzero(refinar), axis=eje), axis=eje)
+        #Los dos intervalos en los que se divide uno refinado siguen 
+        #activos y el resto se dan por convergidos
+        activos = np.zeros(len(v) - 1, dtype=bool)
+        activos[ind + np.arange(len(ind))]     = True
+        activos[ind + np.arange(len(ind)) + 1] = True
+        return v, log_N, activos
+    
+    n_niveles = int(malla["n_niveles"])
+    firma     = firma_calculo(par, da, v_ac, W, MAT, malla, lote)
+    
+    def guardar(nivel):
+        """Guarda la malla en el punto de control"""
+        if punto_control is not None:
+            guardar_punto_control(punto_control, firma=firma, 
+                                  v_param=parametro_tension(par, v_sigma, 
+                                                            MAT),
+                                  v_sigma=v_sigma, v_a=v_a, log_N=log_N, 
+                                  act_s=act_s, act_a=act_a, nivel=nivel,
+                                  n_niveles=n_niveles, n_eval=n_eval)
+    
+    previo = cargar_punto_control(punto_control, firma)
+    if previo is not None:
+        #Se continua desde el ultimo nivel terminado
+        v_sigma = previo["v_sigma"]
+        v_a     = previo["v_a"]
+        log_N   = previo["log_N"]
+        act_s   = previo["act_s"]
+        act_a   = previo["act_a"]
+        n_eval  = int(previo["n_eval"])
+        inicio  = int(previo["nivel"])
+    else:
+        v_sigma = np.linspace(malla["sigma_min"], malla["sigma_max"], 
+                              int(malla["n_sigma"]))
+        v_a     = np.geomspace(malla["a_min"], malla["a_max"], 
+                               int(malla["n_a"]))
+        log_N   = evaluar(v_sigma, v_a)
+        n_eval  = log_N[0].size
+        
+        act_s   = np.ones(len(v_sigma) - 1, dtype=bool)
+        act_a   = np.ones(len(v_a) - 1, dtype=bool)
+        inicio  = 0
+        guardar(inicio)
+    
+    for nivel in range(inicio, n_niveles):
+        refinado = False
+        
+        #Refinamiento en el parametro. El interpolador es lineal en el 
+        #parametro, por lo que el punto medio de cada intervalo se toma en
+        #el parametro y se convierte a tension
+        if np.any(act_s):
+            i_s       = np.flatnonzero(act_s)
+            v_param   = parametro_tension(par, v_sigma, MAT)
+            s_med     = tension_parametro(par, (v_param[i_s] 
+                                                + v_param[i_s + 1])/2.0, MAT)
+            log_N_med = evaluar(s_med, v_a)
+            n_eval   += log_N_med[0].size
+            j_celda   = np.minimum(np.arange(len(v_a)), len(v_a) - 2)
+            error     = error_interpolacion(log_N_med, log_N[:, i_s, :],
+                                            log_N[:, i_s + 1, :],
+                                            lineales()[:, i_s][:, :, j_celda])
+            refinar   = ((np.max(error, axis=(0, 2)) > tol)
+                         & (np.diff(v_sigma)[i_s] > 2.0*malla["ds_min"]))
+            v_sigma, log_N, act_s = insertar(v_sigma, log_N, s_med, 
+                                             log_N_med, act_s, refinar, 1)
+            refinado |= bool(np.any(refinar))
+        
+        #Refinamiento en tamaño de grieta. El interpolador es lineal en 
+        #log(a), por lo que el punto medio es la media geometrica
+        if np.any(act_a):
+            i_a       = np.flatnonzero(act_a)
+            a_med     = np.sqrt(v_a[i_a]*v_a[i_a + 1])
+            log_N_med = evaluar(v_sigma, a_med)
+            n_eval   += log_N_med[0].size
+            i_celda   = np.minimum(np.arange(len(v_sigma)), len(v_sigma) - 2)
+            error     = error_interpolacion(log_N_med, log_N[:, :, i_a],
+                                            log_N[:, :, i_a + 1],
+                                            lineales()[:, i_celda][:, :, i_a])
+            refinar   = ((np.max(error, axis=(0, 1)) > tol)
+                         & (v_a[i_a + 1]/v_a[i_a] > malla["ra_min"]**2.0))
+            v_a, log_N, act_a = insertar(v_a, log_N, a_med, log_N_med, 
+                                         act_a, refinar, 2)
+            refinado |= bool(np.any(refinar))
+        
+        guardar(nivel + 1)
+        
+        if progreso((nivel + 1.0)/n_niveles) is False:
+            return None
+        
+        if not refinado:
+            break
+        
+    print('\nMalla adaptativa: {} tensiones x {} tamaños, {} nodos '
+          'evaluados'.format(len(v_sigma), len(v_a), n_eval))
+    
+    #Los nodos en los que N_i es nulo se recuperan como 0
+    N_i = np.where(log_N > 0.0, 10.0**log_N, 0.0)
+    
+    return v_sigma, parametro_tension(par, v_sigma, MAT), v_a, N_i
+
+###############################################################################
+###############################################################################
+
+def curvas_iniciacion(par, da,ac, W, MAT, lote=True, n_procesos=1, 
+                      progreso=None, malla=None, texto=False):
+    """Escribe un archivo de texto con las curvas de
+    iniciación para distintas longitudes de grieta para un material.
+    
+    INPUT:   par   = parametro para el modelo de iniciacion
+             ac    = plana o eliptica (0 o 0.5) o lista de geometrias. Con
+                     una lista la historia de K_I de cada celda se calcula
+                     una sola vez para todas las geometrias y se escribe un
+                     archivo por geometria
+             da    = paso para realizar los calculos 
+             W     = (m) anchura del especimen
+             MAT   = indice asignado al material
+             lote  = si es True la propagacion de toda la tabla se calcula
+                     de una vez (ver curvas_propagacion_uniforme). Si es 
+                     False se calcula cada celda con fase_iniciacion
+             n_procesos = numero de procesos entre los que se reparten las
+                     filas de la tabla. None utiliza todos los nucleos
+             progreso = funcion progreso(completado) a la que se llama con la
+                     fraccion de filas calculadas cada vez que termina una. 
+                     Si devuelve False se cancela el calculo, no se escribe
+                     ningun archivo y se devuelve None. Por defecto se pinta
+                     el porcentaje en la consola
+             malla = definicion de la malla de la tabla (ver 
+                     MALLA_INICIACION y MALLA_ADAPTATIVA)
+             texto = si es True ademas de la tabla binaria se escribe la
+                     tabla en texto
+                     
+    Mientras se calcula, las filas terminadas se guardan en el punto de 
+    control curvas_inic/MAT_par_ac.parcial.npz. Si el calculo se interrumpe
+    o se cancela, al repetirlo con los mismos datos continua desde ese punto
+    (ver tabla_iniciacion). El punto de control se borra al escribir las 
+    tablas.
+        
+    OUTPUTS: MAT_par.npy  = archivo binario con las curvas de iniciacion
+                            (ver escribir_tabla)
+             MAT_par.dat  = archivo de texto con las curvas de iniciacion, 
+                            si texto es True
+             figura.png   = imagen con las curvas de iniciacion
+             N_i          = matriz de ciclos de iniciacion. Con una lista de
+                            geometrias, diccionario con la matriz de cada 
+                            una"""
+             
+    print(('\nCurvas de iniciacion del material '
+           +'utilizando el parametro {}\n').format(par))
+    
+    v_ac = list(ac) if isinstance(ac, (list, tuple)) else [ac]
+    cwd  = os.getcwd()
+    
+    os.makedirs(cwd + '/curvas_inic', exist_ok=True)
+    punto_control = cwd + '/curvas_inic/MAT_{}_{}{}'.format(
+        par, '_'.join(str(ac_m) for ac_m in v_ac), EXT_PUNTO_CONTROL)
+    
+    t1 = time.time()
+    tabla = tabla_iniciacion(par, da, v_ac, W, MAT, lote, n_procesos, 
+                             progreso, malla, punto_control)
+    if tabla is None:
+        print('\nCalculo cancelado. Se continuara desde {}'.format(
+            punto_control))
+        return None
+    v_sigma, v_param, v_a, N_i = tabla
+    n_a = len(v_a)
     t2= time.time()
     print("\nSe han requerido {:.2f}s".format(t2-t1))  
     
-    #Pintamos las curvas de iniciación
+    for m, ac_m in enumerate(v_ac):
+        ruta     = cwd + '/curvas_inic/{}/'.format(ac_m)
+        ruta_fig = cwd + '/grafs/{}/'.format(ac_m)
+        os.makedirs(ruta, exist_ok=True)
+        os.makedirs(ruta_fig, exist_ok=True)
+        
+        escribir_tabla('{}/MAT_{}.npy'.format(ruta, par), v_param, v_a, 
+                       N_i[m])
+        if texto:
+            escribir_tabla('{}/MAT_{}.dat'.format(ruta, par), v_param, v_a,
+                           N_i[m])
     
-    plt.figure()
-    for i in range(n_a):
-        plt.plot(N_i[:,i],v_sigma)
-    plt.grid()
-    plt.title(f"Curvas de iniciación para el parámetro {par}")
-    plt.xscale("log")
-    plt.xlabel("Ciclos")
-    plt.ylabel("$\sigma (MPa)$")
-
-    # #Guardamos la figura y la cerramos
-    plt.savefig(ruta_fig+f'curvas_inic_{par}.png')
+        #Pintamos las curvas de iniciación
+        
+        plt.figure()
+        for i in range(n_a):
+            plt.plot(N_i[m,:,i],v_sigma)
+        plt.grid()
+        plt.title(f"Curvas de iniciación para el parámetro {par}")
+        plt.xscale("log")
+        plt.xlabel("Ciclos")
+        plt.ylabel("$\sigma (MPa)$")
+    
+        # #Guardamos la figura y la cerramos
+        plt.savefig(ruta_fig+f'curvas_inic_{par}.png')
+        
+    #Las tablas ya estan escritas y el punto de control no se necesita
+    os.remove(punto_control)
 
-    return N_i,n_a,v_sigma
+    if isinstance(ac, (list, tuple)):
+        return dict(zip(v_ac, N_i)),n_a,v_sigma
+    
+    return N_i[0],n_a,v_sigma
 
 def plot_N_i(par,N_i,v_sigma,n_a):
     plt.figure()
@@ -219,8 +1020,7 @@ if __name__ == "__main__":
     acs =["plana","eliptica"]
     
     for par in pars:
-        for ac in acs:
-            N_i,n_a,v_sigma =curvas_iniciacion(par = par, da=1e-5,ac=ac, W = 10e-3, MAT=MAT)
+        N_i,n_a,v_sigma =curvas_iniciacion(par = par, da=1e-5,ac=acs, W = 10e-3, MAT=MAT)
     
     
     
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Created on:
+
+@author: David García y Alejandro Quirós
+
+Constantes de un material. Material es inmutable: las constantes derivadas
+(G, a_0, k = sigma_y/sigma_f y las potencias de f del umbral de crecimiento)
+se calculan una sola vez al crearlo. Se puede utilizar como clave de las
+memorias de calculo (es hashable) y enviar a otros procesos (se puede
+serializar con pickle).
+
+Se accede a las constantes como en el antiguo diccionario del material,
+MAT["K_IC"], o como atributos, MAT.K_IC. Las constantes derivadas de los
+bucles de calculo solo son atributos.
+"""
+
+import numpy as np
+from collections.abc import Mapping
+
+#Constantes del material en el orden de los argumentos de Material. Las dos
+#ultimas (termino plastico de Coffin-Manson) son opcionales
+CONSTANTES = ("C", "n", "f", "l_0", "sigma_fl", "K_th", "K_IC", "sigma_y",
+              "sigma_f", "E", "nu", "b", "eps_f", "c")
+
+#Constantes derivadas que forman parte del antiguo diccionario del material
+DERIVADAS = ("G", "a_0")
+
+###############################################################################
+###############################################################################
+
+class Material(Mapping):
+    """Constantes de un material.
+
+    INPUTS: C, n      = coeficiente y exponente de la ley de crecimiento
+            f         = parametro de la aproximacion al diagrama de
+                        Kitagawa-Takahashi
+            l_0       = (m) distancia a la primera barrera microestructural
+            sigma_fl  = (MPa) limite de fatiga
+            K_th      = (MPa m^0.5) umbral de crecimiento de grieta larga
+            K_IC      = (MPa m^0.5) tenacidad a fractura
+            sigma_y   = (MPa) limite elastico
+            sigma_f   = (MPa) coeficiente de resistencia a fatiga
+            E         = (MPa) modulo de Young
+            nu        = coeficiente de Poisson
+            b         = exponente de Basquin
+            eps_f, c  = coeficiente y exponente de ductilidad (opcionales).
+                        Si se indican, la curva de vida incluye el termino
+                        plastico de Coffin-Manson (ver ciclos_totales)
+
+    Constantes derivadas:
+            G         = (MPa) modulo de cizalladura
+            a_0       = (m) parametro de El Haddad
+            k         = sigma_y/sigma_f
+            c_umbral  = a_0**f - l_0**f, termino constante del umbral
+            f_medio   = 0.5*f, exponente del umbral"""
+
+    __slots__ = CONSTANTES + DERIVADAS + ("k", "c_umbral", "f_medio")
+
+    def __init__(self, C, n, f, l_0, sigma_fl, K_th, K_IC, sigma_y, sigma_f,
+                 E, nu, b, eps_f=None, c=None):
+
+        valores = (C, n, f, l_0, sigma_fl, K_th, K_IC, sigma_y, sigma_f, E,
+                   nu, b)
+        for nombre, valor in zip(CONSTANTES, valores):
+            object.__setattr__(self, nombre, float(valor))
+        for nombre, valor in (("eps_f", eps_f), ("c", c)):
+            object.__setattr__(self, nombre,
+                               None if valor is None else float(valor))
+
+        #Constantes derivadas, con las mismas expresiones que el antiguo
+        #diccionario
+        G   = self.E/(2.0*(1.0 + self.nu))
+        a_0 = 1/np.pi*(self.K_th/(self.sigma_fl))**2.0
+
+        object.__setattr__(self, "G",        G)
+        object.__setattr__(self, "a_0",      a_0)
+        object.__setattr__(self, "k",        self.sigma_y/self.sigma_f)
+        object.__setattr__(self, "c_umbral", a_0**self.f - self.l_0**self.f)
+        object.__setattr__(self, "f_medio",  0.5*self.f)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Crea el material a partir de un diccionario con sus constantes.
+        Las constantes derivadas del diccionario (G y a_0) no se utilizan:
+        se calculan de nuevo. Si falta alguna constante obligatoria se
+        produce un KeyError."""
+
+        return cls(*(datos[nombre] for nombre in CONSTANTES[:-2]),
+                   eps_f=datos.get("eps_f"), c=datos.get("c"))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("Material es inmutable")
+
+    def __delattr__(self, nombre):
+        raise AttributeError("Material es inmutable")
+
+    def constantes(self):
+        """Devuelve la tupla de constantes del material en el orden de
+        CONSTANTES. Identifica al material."""
+
+        return tuple(getattr(self, nombre) for nombre in CONSTANTES)
+
+    def __reduce__(self):
+        return (self.__class__, self.constantes())
+
+    def __eq__(self, otro):
+        if not isinstance(otro, Material):
+            return NotImplemented
+        return self.constantes() == otro.constantes()
+
+    def __hash__(self):
+        return hash(self.constantes())
+
+    def __repr__(self):
+        return "Material({})".format(", ".join(
+            "{}={!r}".format(nombre, getattr(self, nombre))
+            for nombre in CONSTANTES if getattr(self, nombre) is not None))
+
+    #Acceso como diccionario. Las claves son las del antiguo diccionario del
+    #material: las constantes que tienen valor, G y a_0
+    def __getitem__(self, clave):
+        if clave in CONSTANTES + DERIVADAS:
+            valor = getattr(self, clave)
+            if valor is not None:
+                return valor
+        raise KeyError(clave)
+
+    def __iter__(self):
+        for nombre in CONSTANTES + DERIVADAS:
+            if getattr(self, nombre) is not None:
+                yield nombre
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+###############################################################################
+###############################################################################
+
+def como_material(MAT):
+    """Devuelve MAT como Material. Los diccionarios de constantes se
+    convierten con Material.desde_dict."""
+
+    if isinstance(MAT, Material):
+        return MAT
+
+    return Material.desde_dict(MAT)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on:
+
+@author: David García y Alejandro Quirós
+
+Núcleos de cálculo de la fase de propagación: la integral de K_I por la regla
+del punto medio, el umbral de crecimiento de la grieta, la velocidad de
+crecimiento inversa dN/da y la marcha de paso fijo de la grieta, que es
+secuencial en a.
+
+Cada núcleo tiene una implementacion de referencia vectorizada con NumPy y,
+si numba está instalado, una versión con bucles compilada JIT. Por defecto se
+utiliza la versión compilada cuando está disponible. El motor se puede
+cambiar con seleccionar_motor().
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+###############################################################################
+###############################################################################
+
+def KI_punto_medio(sigma, k, a, ds, W):
+    """Devuelve el factor de intensidad de tensiones de un perfil de 
+    tensiones con la regla del punto medio en cada intervalo del perfil.
+    
+    INPUTS: sigma = (MPa) perfil de tensiones desde la superficie
+            k     = vector de indices del nodo de la punta de la grieta
+            a     = (m) vector de longitudes de grieta
+            ds    = (m) paso entre nodos del perfil
+            W     = (m) espesor del especimen
+            
+    OUTPUT: K_I   = (MPa m^0.5) vector de factores de intensidad de 
+                    tensiones"""
+    
+    k = k[:, None]
+    a = a[:, None]
+    j = np.arange(len(sigma) - 1)
+    
+    #Funciones de peso
+    m1 = 0.6147 + 17.1844*(a/W)**2.0 + 8.7822*(a/W)**6.0
+    m2 = 0.2502 + 3.2889*(a/W)**2.0 + 70.0444*(a/W)**6.0
+    
+    valido = j < k
+    s      = np.where(valido, (k - j - 0.5)*ds, ds)
+    s_med  = (sigma[:-1] + sigma[1:])/2.0
+    integr = np.where(valido, s_med/s**0.5*(1.0 + m1*s/a + m2*(s/a)**2.0), 
+                      0.0)
+    
+    K_I = (2.0/np.pi)**0.5*np.sum(integr, axis=1)*ds
+    
+    return K_I
+
+###############################################################################
+###############################################################################
+
+def umbral(x, K_th, f, f_medio, c_umbral):
+    """Devuelve el umbral de crecimiento de la grieta, aproximacion al
+    diagrama de Kitagawa-Takahashi con el parametro de El Haddad.
+    
+    INPUTS: x        = (m) vector de longitudes de grieta
+            K_th     = (MPa m^0.5) umbral de crecimiento de grieta larga
+            f        = parametro de la aproximacion al diagrama
+            f_medio  = 0.5*f, exponente del umbral
+            c_umbral = a_0**f - l_0**f, con a_0 el parametro de El Haddad y
+                       l_0 la distancia a la primera barrera 
+                       microestructural (ver Material)
+            
+    OUTPUT: umbral   = (MPa m^0.5) vector de umbrales de crecimiento"""
+    
+    x_f = x**f
+    
+    return K_th*(x_f/(x_f + c_umbral))**f_medio
+
+###############################################################################
+###############################################################################
+
+def velocidad(ki, umbral, C, n):
+    """Devuelve el integrando de los ciclos de propagacion, dN/da. Por debajo
+    del umbral la grieta no crece y el integrando toma el valor 1e20.
+    
+    INPUTS: ki     = (MPa m^0.5) vector de factores de intensidad de tensiones
+            umbral = (MPa m^0.5) vector de umbrales de crecimiento
+            C      = coeficiente de la ley de crecimiento
+            n      = exponente de la ley de crecimiento
+            
+    OUTPUT: res    = vector de integrandos de los ciclos de propagacion"""
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = np.where(ki < umbral, 1e20, 1.0/(C*(ki**n - umbral**n)))
+        
+    return res
+
+###############################################################################
+###############################################################################
+
+#Versiones con bucles explicitos de los núcleos anteriores. Son las que se 
+#compilan con numba.
+
+def KI_punto_medio_bucle(sigma, k, a, ds, W):
+    """Version con bucles de KI_punto_medio"""
+    
+    K_I = np.zeros(len(k))
+    
+    for i in range(len(k)):
+        #Funciones de peso
+        m1 = 0.6147 + 17.1844*(a[i]/W)**2.0 + 8.7822*(a[i]/W)**6.0
+        m2 = 0.2502 + 3.2889*(a[i]/W)**2.0 + 70.0444*(a[i]/W)**6.0
+        
+        integral = 0.0
+        for j in range(k[i]):
+            s = (k[i] - j - 0.5)*ds
+            s_med = (sigma[j] + sigma[j + 1])/2.0
+            integral += s_med/s**0.5*(1.0 + m1*s/a[i] + m2*(s/a[i])**2.0)
+            
+        K_I[i] = (2.0/np.pi)**0.5*integral*ds
+        
+    return K_I
+
+def umbral_bucle(x, K_th, f, f_medio, c_umbral):
+    """Version con bucles de umbral"""
+    
+    res = np.zeros(len(x))
+    
+    for i in range(len(x)):
+        x_f    = x[i]**f
+        res[i] = K_th*(x_f/(x_f + c_umbral))**f_medio
+        
+    return res
+
+def velocidad_bucle(ki, umbral, C, n):
+    """Version con bucles de velocidad"""
+    
+    res = np.zeros(len(ki))
+    
+    for i in range(len(ki)):
+        if ki[i] < umbral[i]:
+            res[i] = 1e20
+        elif ki[i] == umbral[i]:
+            res[i] = np.inf
+        else:
+            res[i] = 1.0/(C*(ki[i]**n - umbral[i]**n))
+            
+    return res
+
+###############################################################################
+###############################################################################
+
+def crear_marcha_perfil(KI_punto_medio, umbral, velocidad):
+    """Devuelve la funcion de la marcha de paso fijo construida con los 
+    núcleos indicados, de forma que la versión compilada llame a los núcleos
+    compilados."""
+    
+    def marcha_perfil(sigma, ind_a, a_i, da, W, phi, C, n, f, f_medio, 
+                      c_umbral, K_th, K_IC):
+        """Integra con paso fijo la propagacion de una grieta en un perfil de
+        tensiones desde a_i hasta alcanzar K_IC. En cada paso el perfil crece
+        un nodo, como en fase_propagacion.
+    
+        INPUTS: sigma = (MPa) perfil de tensiones desde la superficie con 
+                        paso da
+                ind_a = indice asociado a la longitud de grieta inicial
+                a_i   = (m) longitud inicial de la grieta
+                da    = (m) paso de longitudes de grietas
+                W     = (m) anchura del especimen
+                phi   = factor de la grieta eliptica
+                C, n, f, f_medio, c_umbral, K_th, K_IC = constantes del 
+                        material (ver Material)
+    
+        OUTPUT: N_p   = ciclos de la fase de propagacion"""
+    
+        N_p  = 0.0
+        a    = a_i
+        ki   = 0.0
+        i    = 0
+        v_k  = np.zeros(1, dtype=np.int64)
+        v_a  = np.zeros(1)
+        v_ki = np.zeros(1)
+    
+        while ki < K_IC:
+            #La punta de la grieta es el nodo más cercano a a dentro del 
+            #perfil disponible en este paso
+            n_perfil = min(ind_a + 1 + i, len(sigma))
+            v_k[0]   = min(int(np.rint(a/da)), n_perfil - 1)
+            v_a[0]   = a
+    
+            ki      = KI_punto_medio(sigma, v_k, v_a, da, W)[0]/phi
+            v_ki[0] = ki
+            u       = umbral(v_a, K_th, f, f_medio, c_umbral)
+            res     = velocidad(v_ki, u, C, n)[0]
+    
+            N_p += res*da
+            a   += da
+            i   += 1
+    
+        return N_p
+    
+    return marcha_perfil
+
+###############################################################################
+###############################################################################
+
+#Implementaciones de referencia con NumPy
+NUCLEOS = {"numpy": {"KI_punto_medio": KI_punto_medio,
+                     "umbral"        : umbral,
+                     "velocidad"     : velocidad,
+                     "marcha_perfil" : crear_marcha_perfil(KI_punto_medio,
+                                                           umbral, velocidad)}}
+
+#Implementaciones compiladas con numba. La compilación se realiza en la 
+#primera llamada de cada núcleo.
+if njit is not None:
+    KI_punto_medio_jit = njit(KI_punto_medio_bucle)
+    umbral_jit         = njit(umbral_bucle)
+    velocidad_jit      = njit(velocidad_bucle)
+    
+    NUCLEOS["numba"] = {"KI_punto_medio": KI_punto_medio_jit,
+                        "umbral"        : umbral_jit,
+                        "velocidad"     : velocidad_jit,
+                        "marcha_perfil" : njit(crear_marcha_perfil(
+                                            KI_punto_medio_jit, umbral_jit,
+                                            velocidad_jit))}
+
+motor = "numba" if "numba" in NUCLEOS else "numpy"
+
+###############################################################################
+###############################################################################
+
+def seleccionar_motor(nombre):
+    """Selecciona el motor de los núcleos de cálculo.
+    
+    INPUT:  nombre = "numba" o "numpy". Si se pide "numba" y no está 
+                     instalado se utiliza "numpy"
+                     
+    OUTPUT: motor  = motor seleccionado"""
+    
+    global motor
+    
+    if nombre not in ("numba", "numpy"):
+        raise ValueError("Motor desconocido: {}".format(nombre))
+    
+    motor = nombre if nombre in NUCLEOS else "numpy"
+    
+    return motor
+
+###############################################################################
+###############################################################################
+
+def nucleo(nombre):
+    """Devuelve la implementacion del núcleo indicado en el motor 
+    seleccionado."""
+    
+    return NUCLEOS[motor][nombre]
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Created on:
+
+@author: David García y Alejandro Quirós
+
+Busqueda del plano critico de todos los puntos de un experimento a la vez.
+Las orientaciones se definen con los mismos tres angulos que rotar_matriz
+(ver principal). Los tensores de todos los puntos se apilan en matrices
+(N, 3, 3) y el Fatemi-Socie o el Smith-Watson-Topper se evalua con einsum
+para un conjunto de orientaciones candidatas en todos los puntos. Solo las
+mejores candidatas de cada punto se refinan, con una busqueda por patrones
+tambien vectorizada.
+"""
+
+import numpy as np
+
+#Malla de orientaciones candidatas y refinamiento
+N_MALLA   = 12      #angulos por eje de la malla inicial
+N_MEJORES = 3       #candidatas que se refinan en cada punto
+N_ITER    = 20      #iteraciones de la busqueda por patrones
+
+###############################################################################
+###############################################################################
+
+def tensores(vector):
+    """Devuelve los tensores de todos los puntos a partir del vector de
+    tensiones o deformaciones, con el orden de componentes de hacer_matriz.
+
+    INPUT:  vector = matriz (N, 6) con las componentes xx, yy, zz, xy, xz, yz
+
+    OUTPUT: T      = matriz (N, 3, 3) de tensores"""
+
+    vector = np.asarray(vector, dtype=float)
+    ind    = np.array([[0, 3, 4],
+                       [3, 1, 5],
+                       [4, 5, 2]])
+
+    return vector[:, ind]
+
+###############################################################################
+###############################################################################
+
+def matrices_rotacion(alfa):
+    """Devuelve las matrices de rotacion R = R_x @ R_y @ R_z de rotar_matriz
+    para un conjunto de angulos.
+
+    INPUT:  alfa = matriz (..., 3) de angulos
+
+    OUTPUT: R    = matriz (..., 3, 3) de rotaciones"""
+
+    c = np.cos(alfa)
+    s = np.sin(alfa)
+    c_x, c_y, c_z = c[..., 0], c[..., 1], c[..., 2]
+    s_x, s_y, s_z = s[..., 0], s[..., 1], s[..., 2]
+
+    R = np.empty(alfa.shape[:-1] + (3, 3))
+    R[..., 0, 0] = c_y*c_z
+    R[..., 0, 1] = -c_y*s_z
+    R[..., 0, 2] = -s_y
+    R[..., 1, 0] = -s_x*s_y*c_z + c_x*s_z
+    R[..., 1, 1] = s_x*s_y*s_z + c_x*c_z
+    R[..., 1, 2] = -s_x*c_y
+    R[..., 2, 0] = c_x*s_y*c_z + s_x*s_z
+    R[..., 2, 1] = -c_x*s_y*s_z + s_x*c_z
+    R[..., 2, 2] = c_x*c_y
+
+    return R
+
+###############################################################################
+###############################################################################
+
+def columnas_rotacion(c, s):
+    """Devuelve las dos primeras columnas de las matrices de rotacion 
+    R = R_x @ R_y @ R_z a partir de los cosenos y senos de los angulos, que
+    son las unicas que intervienen en el plano critico. Los cosenos y senos 
+    de cada eje pueden tener formas distintas que se puedan combinar, de 
+    forma que se obtienen todas las combinaciones de angulos sin repetir 
+    las funciones trigonometricas.
+    
+    INPUTS:  c   = (c_x, c_y, c_z) cosenos de los angulos de cada eje
+             s   = (s_x, s_y, s_z) senos de los angulos de cada eje
+             
+    OUTPUTS: e_x = matriz (..., 3) con la primera columna de R
+             e_y = matriz (..., 3) con la segunda columna de R"""
+    
+    c_x, c_y, c_z = c
+    s_x, s_y, s_z = s
+    
+    #Productos de los angulos y y z, comunes a todos los angulos x
+    sy_cz = s_y*c_z
+    sy_sz = s_y*s_z
+    
+    forma = np.broadcast_shapes(np.shape(c_x), np.shape(sy_cz)) + (3,)
+    e_x   = np.empty(forma)
+    e_y   = np.empty(forma)
+    
+    e_x[..., 0] = c_y*c_z
+    e_x[..., 1] = c_x*s_z - s_x*sy_cz
+    e_x[..., 2] = c_x*sy_cz + s_x*s_z
+    e_y[..., 0] = -c_y*s_z
+    e_y[..., 1] = s_x*sy_sz + c_x*c_z
+    e_y[..., 2] = s_x*c_z - c_x*sy_sz
+    
+    return e_x, e_y
+
+###############################################################################
+###############################################################################
+
+def objetivo(par, e_x, e_y, S, dE):
+    """Devuelve la funcion que se maximiza en el plano critico para varias
+    orientaciones de cada punto: delta_gamma/2 = E'_xy(max) - E'_xy(min)
+    para el Fatemi-Socie y el Smith-Watson-Topper S'_xx*(E'_xx(max) -
+    E'_xx(min))/2, con T' = R.T @ T @ R. Las componentes de T' se obtienen
+    con las columnas de R, T'_xy = e_x.T @ T @ e_y.
+
+    INPUTS: par  = 'FS' o 'SWT'
+            e_x  = matriz (N, M, 3) o (M, 3) con la primera columna de R de
+                   cada orientacion (ver columnas_rotacion)
+            e_y  = idem con la segunda columna
+            S    = (MPa) matriz (N, 3, 3) de tensores de tensiones maximas
+            dE   = matriz (N, 3, 3) de tensores de rango de deformaciones
+
+    OUTPUT: f    = matriz (N, M) de valores de la funcion"""
+
+    #Los tensores son simetricos, por lo que e @ T es (T @ e).T. Las 
+    #orientaciones comunes a todos los puntos se combinan con cada punto
+    indices = 'mi,nmi->nm' if e_x.ndim == 2 else 'nmi,nmi->nm'
+    
+    if par == 'FS':
+        return np.einsum(indices, e_x, e_y @ dE)
+
+    if par == 'SWT':
+        return (np.einsum(indices, e_x, e_x @ S)
+                *np.einsum(indices, e_x, e_x @ dE)/2.0)
+
+    raise ValueError("Parametro de iniciacion desconocido: {}".format(par))
+
+###############################################################################
+###############################################################################
+
+def plano_critico(par, S, dE, n_malla=N_MALLA, n_mejores=N_MEJORES,
+                  n_iter=N_ITER):
+    """Busca en todos los puntos a la vez la orientacion que maximiza la
+    funcion del plano critico (ver objetivo).
+
+    Se evalua la funcion en una malla de n_malla^3 orientaciones comun a
+    todos los puntos y se refinan las n_mejores mejores de cada punto con
+    una busqueda por patrones: en cada iteracion cada candidata se mueve al
+    mejor de los 27 puntos de su entorno (incluido el propio) y el paso se
+    reduce a la mitad. Con varias candidatas por punto se evitan los maximos
+    locales en los que se puede detener un optimizador que parte de una sola
+    orientacion.
+
+    INPUTS:  par       = 'FS' o 'SWT'
+             S         = (MPa) matriz (N, 3, 3) de tensores de tensiones
+                         maximas
+             dE        = matriz (N, 3, 3) de tensores de rango de
+                         deformaciones
+             n_malla   = numero de angulos por eje de la malla inicial
+             n_mejores = numero de candidatas que se refinan en cada punto
+             n_iter    = numero de iteraciones de la busqueda por patrones
+
+    OUTPUTS: f_max     = vector (N) con el maximo de la funcion
+             alfa      = matriz (N, 3) de angulos de la orientacion critica"""
+
+    n = len(S)
+
+    #Malla inicial de orientaciones en los centros de las celdas
+    h       = 2.0*np.pi/n_malla
+    angulos = -np.pi + (np.arange(n_malla) + 0.5)*h
+    c, s    = np.cos(angulos), np.sin(angulos)
+    e_x, e_y = columnas_rotacion((c[:, None, None], c[None, :, None], 
+                                  c[None, None, :]),
+                                 (s[:, None, None], s[None, :, None], 
+                                  s[None, None, :]))
+    f       = objetivo(par, e_x.reshape(-1, 3), e_y.reshape(-1, 3), S, dE)
+
+    #Mejores candidatas de cada punto
+    n_mejores = min(n_mejores, f.shape[1])
+    mejores   = np.argpartition(-f, n_mejores - 1, axis=1)[:, :n_mejores]
+    alfa      = angulos[np.stack(np.unravel_index(mejores, (n_malla,)*3), 
+                                 axis=-1)]                     #(N, K, 3)
+
+    #Busqueda por patrones. Los 27 puntos del entorno de cada candidata son
+    #las combinaciones de los tres desplazamientos de cada angulo
+    paso = np.array([-1.0, 0.0, 1.0])
+    h   /= 2.0
+    for _ in range(n_iter):
+        ang  = alfa[:, :, :, None] + h*paso                    #(N, K, 3, 3)
+        c, s = np.cos(ang), np.sin(ang)
+        e_x, e_y = columnas_rotacion(
+            (c[:, :, 0, :, None, None], c[:, :, 1, None, :, None], 
+             c[:, :, 2, None, None, :]),
+            (s[:, :, 0, :, None, None], s[:, :, 1, None, :, None], 
+             s[:, :, 2, None, None, :]))
+        f    = objetivo(par, e_x.reshape(n, -1, 3), e_y.reshape(n, -1, 3),
+                        S, dE).reshape(n, n_mejores, 27)
+        ind  = np.stack(np.unravel_index(np.argmax(f, axis=2), (3, 3, 3)),
+                        axis=-1)
+        alfa = alfa + h*paso[ind]
+        h   /= 2.0
+
+    #Mejor candidata de cada punto
+    c, s     = np.cos(alfa), np.sin(alfa)
+    e_x, e_y = columnas_rotacion(np.moveaxis(c, -1, 0), np.moveaxis(s, -1, 0))
+    f        = objetivo(par, e_x, e_y, S, dE)
+    mejor    = np.argmax(f, axis=1)
+
+    return f[np.arange(n), mejor], alfa[np.arange(n), mejor]
+
+###############################################################################
+###############################################################################
+
+def valores_principales(S, dE):
+    """Devuelve los valores y direcciones principales de los tensores de 
+    tensiones y de rango de deformaciones de todos los puntos. Son comunes
+    al plano critico de todos los criterios, por lo que se calculan una sola
+    vez cuando se calculan varios (ver plano_critico_principal).
+    
+    INPUTS:  S      = (MPa) matriz (N, 3, 3) de tensores de tensiones maximas
+             dE     = matriz (N, 3, 3) de tensores de rango de deformaciones
+             
+    OUTPUTS: propios = ((l_S, v_S), (l_E, v_E)), valores principales 
+                       crecientes (N, 3) y direcciones principales en 
+                       columnas (N, 3, 3) de S y dE (ver numpy.linalg.eigh)"""
+    
+    return np.linalg.eigh(S), np.linalg.eigh(dE)
+
+###############################################################################
+###############################################################################
+
+def plano_critico_principal(par, S, dE, n_iter=50, tol=1e-14, propios=None):
+    """Calcula el plano critico de todos los puntos a la vez a partir de 
+    los valores y direcciones principales, con numpy.linalg.eigh, sin 
+    busqueda en los angulos.
+    
+    Fatemi-Socie: el maximo de E'_xy(max) - E'_xy(min) en todas las 
+    orientaciones es la mitad de la diferencia entre los valores principales
+    extremos del rango de deformaciones, (l_max - l_min)/2, en el plano 
+    con normal (v_max + v_min)/2^0.5 y direccion de cortadura 
+    (v_max - v_min)/2^0.5. El plano con normal y direccion intercambiadas 
+    tiene la misma cortadura.
+    
+    Smith-Watson-Topper: el maximo de (n.S.n)*(n.dE.n)/2 se alcanza en una 
+    direccion principal si S y dE tienen las mismas direcciones principales.
+    En general la normal critica es un vector propio de la matriz 
+    (n.dE.n)*S + (n.S.n)*dE, por lo que se parte de la mejor direccion 
+    principal de S y dE y en cada iteracion se toma el mejor de los 
+    vectores propios de esa matriz hasta que la funcion deja de crecer.
+    
+    INPUTS:  par    = 'FS' o 'SWT'
+             S      = (MPa) matriz (N, 3, 3) de tensores de tensiones maximas
+             dE     = matriz (N, 3, 3) de tensores de rango de deformaciones
+             n_iter = numero maximo de iteraciones del Smith-Watson-Topper
+             tol    = tolerancia relativa del crecimiento de la funcion
+             propios = valores y direcciones principales de S y dE, si ya
+                      se han calculado (ver valores_principales)
+             
+    OUTPUTS: f_max  = vector (N) con el maximo de la funcion (ver objetivo)
+             normal = matriz (N, 3) de normales unitarias de los planos 
+                      criticos"""
+    
+    n = len(S)
+    
+    if propios is None:
+        propios = valores_principales(S, dE)
+    (_, v_S), (l_E, v_E) = propios
+    
+    if par == 'FS':
+        l, v   = l_E, v_E
+        normal = (v[:, :, 2] + v[:, :, 0])/2.0**0.5
+        return (l[:, 2] - l[:, 0])/2.0, normal
+    
+    if par != 'SWT':
+        raise ValueError("Parametro de iniciacion desconocido: {}".format(
+                         par))
+    
+    def swt(cand):
+        """Funcion del Smith-Watson-Topper para (N, M, 3) normales"""
+        return objetivo('SWT', cand, cand, S, dE)
+    
+    def mejor(cand):
+        """Mejor normal de las candidatas de cada punto y su funcion"""
+        f   = swt(cand)
+        ind = np.argmax(f, axis=1)
+        return cand[np.arange(n), ind], f[np.arange(n), ind]
+    
+    #Direcciones principales de S y dE
+    normal, f_max = mejor(np.concatenate((np.swapaxes(v_S, 1, 2), 
+                                          np.swapaxes(v_E, 1, 2)), axis=1))
+    
+    for _ in range(n_iter):
+        s_n = np.einsum('ni,nij,nj->n', normal, S, normal)
+        e_n = np.einsum('ni,nij,nj->n', normal, dE, normal)
+        _, v = np.linalg.eigh(e_n[:, None, None]*S + s_n[:, None, None]*dE)
+        
+        #La normal actual se mantiene entre las candidatas, de forma que la
+        #funcion no decrece
+        cand = np.concatenate((normal[:, None, :], np.swapaxes(v, 1, 2)), 
+                              axis=1)
+        normal, f_nueva = mejor(cand)
+        
+        crecimiento = f_nueva - f_max
+        f_max       = f_nueva
+        if np.all(crecimiento <= tol*np.abs(f_max)):
+            break
+    
+    return f_max, normal
+
+###############################################################################
+###############################################################################
+
+if __name__ == "__main__":
+    #Comprobacion de los metodos de calculo del plano critico con los datos
+    #experimentales: diferencia relativa del parametro respecto del 
+    #optimizador y angulo entre las normales de los metodos vectorizados
+    from principal import lectura_datos, parametro
+    from propagacion import MAT
+    from time import time
+    
+    exp = ['3006_1543_150', '3006_2113_150', '3006_1543_175', 
+           '3006_2113_175']
+    
+    for i in exp:
+        x, _, s_max, e_max, e_min = lectura_datos("datos_exp", 
+                                                  "TENSOR_TRACCION_" + i, 
+                                                  "TENSOR_COMPRESION_" + i)
+        for par in ["FS", "SWT"]:
+            res = {}
+            for metodo in ["optimizador", "lotes", "principal"]:
+                t0 = time()
+                res[metodo] = parametro(par, MAT, x, s_max, e_max, e_min, 
+                                        metodo, normales=True)
+                res[metodo] += (time() - t0,)
+            
+            p_opt = res["optimizador"][0]
+            print("\n{} {}".format(i, par))
+            for metodo, (p, normal, t) in res.items():
+                #En el Fatemi-Socie los dos planos de maxima cortadura son
+                #equivalentes, por lo que se compara con el más cercano
+                cos = np.abs(np.sum(normal*res["principal"][1], axis=1))
+                if par == "FS":
+                    l, v  = np.linalg.eigh(tensores(e_max) - tensores(e_min))
+                    otra  = (v[:, :, 2] - v[:, :, 0])/2.0**0.5
+                    cos   = np.maximum(cos, np.abs(np.sum(normal*otra, 
+                                                          axis=1)))
+                angulo = np.degrees(np.arccos(np.clip(cos, 0.0, 1.0)))
+                print("    {:<12} {:8.4f}s  dif. relativa {:+.2e} / {:+.2e}"
+                      "  angulo max. {:.2e} grados".format(
+                      metodo, t, np.min((p - p_opt)/np.abs(p_opt)), 
+                      np.max((p - p_opt)/np.abs(p_opt)), np.max(angulo)))
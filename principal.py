@@ -6,13 +6,21 @@ Created on:
 """
 
 import os
+import warnings
 # import math
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import ticker
 from scipy.optimize import minimize
-from scipy.interpolate import interp2d, interp1d
-from propagacion import fase_propagacion,MAT
+from scipy.interpolate import interp1d
+from propagacion import (curva_propagacion, curva_propagacion_continua, 
+                         IntegracionFallida, MAT)
+from cache_tablas import obtener_tablas, SuperficieIniciacion
+from iniciacion import interpolador_tabla
+from material import como_material
+from biblioteca import biblioteca
+from plano_critico import (tensores, plano_critico, plano_critico_principal,
+                           matrices_rotacion, valores_principales)
 import pandas as pd
 from time import time
 import re
@@ -41,7 +49,7 @@ def lectura_datos(ruta, exp_max, exp_min):
     x = datos_max.Y.to_numpy()*(-1e-3)-0.1
   
     #Cargamos el resto de datos
-    sxx_max = datos_max.s_xx.to_numpy().tolist()
+    sxx_max = datos_max.s_xx.to_numpy()
     
     s_max = datos_max[["s_xx", "s_yy","s_zz", "s_xy", "s_xz","s_yz"]].to_numpy()
     
@@ -106,7 +114,8 @@ def hacer_matriz(vector,i=0):
     return m
     
 
-def parametro(par, MAT, x, s_max, e_max, e_min):
+def parametro(par, MAT, x, s_max, e_max, e_min, metodo="principal",
+              normales=False):
     """Calcula el vector para el modelo de iniciacion asociado 
     a un experimento.
     
@@ -116,9 +125,20 @@ def parametro(par, MAT, x, s_max, e_max, e_min):
              s_max  = (MPa) vector de tensiones máximas
              e_max  = vector de deformaciones máximas
              e_min  = vector de deformaciones minimas
+             metodo = "principal" --> el plano critico se obtiene de los 
+                      valores y direcciones principales de todos los puntos
+                      a la vez (ver plano_critico_principal)
+                      "lotes" --> el plano critico de todos los puntos se
+                      busca a la vez (ver plano_critico)
+                      "optimizador" --> se minimiza punto a punto con 
+                      scipy.optimize.minimize partiendo de alfa0
+             normales = si es True se devuelven tambien las normales de los
+                      planos criticos
 
     OUTPUTS: FS/SWT = vector con los Fatemi-Socie o Smith-Watson-Topper en cada
-             punto"""    
+             punto
+             normal = matriz (N, 3) de normales unitarias de los planos 
+             criticos, si normales es True"""    
         
     def func_FS(alfa, j):
         """"Devuelve delta_gamma_max/2 en un punto concreto. Se utiliza en el
@@ -153,9 +173,15 @@ def parametro(par, MAT, x, s_max, e_max, e_min):
     #Limites para el angulo
     bnds = ((-np.pi, np.pi), (-np.pi, np.pi), (-np.pi, np.pi))
     
+    MAT     = como_material(MAT)
     sigma_y = MAT["sigma_y"]
-    sigma_f = MAT["sigma_f"]
-    k       = sigma_y/sigma_f
+    k       = MAT.k
+    
+    if metodo in ("principal", "lotes"):
+        S_max = tensores(s_max)
+        d_E   = tensores(e_max) - tensores(e_min)
+        f_max, normal = parametro_tensores(par, MAT, S_max, d_E, metodo)
+        return (f_max, normal) if normales else f_max
     
     alfa            = np.zeros((len(x),3))
     delta_gamma_max = np.zeros_like(x)
@@ -173,6 +199,9 @@ def parametro(par, MAT, x, s_max, e_max, e_min):
             S_max = rotar_matriz(alfa[j,:],S_xyz_max)
             s_norm[j]=S_max[2,2]          
             FS[j]= delta_gamma_max[j]/2.0*(1.0 + k*s_norm[j]/sigma_y)
+            alfa[j,:]=fs.x
+        if normales:
+            return FS, matrices_rotacion(alfa)[:, :, 0]
         return FS
 
     elif par == 'SWT':
@@ -181,34 +210,278 @@ def parametro(par, MAT, x, s_max, e_max, e_min):
                             options={'disp': False})
             alfa[j,:]=swt.x
             SWT[j]=-swt.fun
+        if normales:
+            return SWT, matrices_rotacion(alfa)[:, :, 0]
         return SWT
 
 ###############################################################################
 ###############################################################################
 
-def principal(par, W, MAT,ac,trat,exp_max, exp_min):
+def parametro_tensores(par, MAT, S_max, d_E, metodo="principal", 
+                       propios=None):
+    """Calcula el parametro de iniciacion y el plano critico de todos los
+    puntos de un experimento a partir de sus tensores (ver parametro).
+    
+    INPUT:   par     = parametro para el modelo de iniciacion
+             MAT     = material (Material)
+             S_max   = (MPa) matriz (N, 3, 3) de tensores de tensiones 
+                       maximas
+             d_E     = matriz (N, 3, 3) de tensores de rango de deformaciones
+             metodo  = "principal" o "lotes" (ver parametro)
+             propios = valores y direcciones principales de S_max y d_E, si
+                       ya se han calculado (ver valores_principales)
+             
+    OUTPUTS: FS/SWT  = vector con los Fatemi-Socie o Smith-Watson-Topper en 
+                       cada punto
+             normal  = matriz (N, 3) de normales unitarias de los planos 
+                       criticos"""
+    
+    if metodo == "principal":
+        f_max, normal = plano_critico_principal(par, S_max, d_E, 
+                                                propios=propios)
+    else:
+        f_max, alfa = plano_critico(par, S_max, d_E)
+        normal      = matrices_rotacion(alfa)[:, :, 0]
+    if par == 'FS':
+        #Como con el optimizador, la tension normal es la componente zz
+        #del tensor sin rotar
+        f_max = f_max*(1.0 + MAT.k*S_max[:, 2, 2]/MAT["sigma_y"])
+        
+    return f_max, normal
+
+###############################################################################
+###############################################################################
+
+def parametros(v_par, MAT, x, s_max, e_max, e_min, metodo="principal"):
+    """Calcula los vectores de varios parametros de iniciacion de un 
+    experimento. Los tensores de todos los puntos y, con el metodo 
+    "principal", sus valores y direcciones principales se calculan una sola
+    vez para todos los parametros.
+    
+    INPUT:   v_par  = lista de parametros para el modelo de iniciacion
+             MAT, x, s_max, e_max, e_min, metodo = ver parametro
+             
+    OUTPUTS: v_param = diccionario con el vector de cada parametro"""
+    
+    if metodo not in ("principal", "lotes"):
+        return {par: parametro(par, MAT, x, s_max, e_max, e_min, metodo) 
+                for par in v_par}
+    
+    MAT     = como_material(MAT)
+    S_max   = tensores(s_max)
+    d_E     = tensores(e_max) - tensores(e_min)
+    propios = (valores_principales(S_max, d_E) if metodo == "principal" 
+               else None)
+    
+    return {par: parametro_tensores(par, MAT, S_max, d_E, metodo, 
+                                    propios)[0] for par in v_par}
+
+###############################################################################
+###############################################################################
+
+def ciclos_iniciacion(v_ai, x, param, function_interp):
+    """Devuelve los ciclos de iniciacion para cada longitud de grieta 
+    interpolando en las curvas de iniciacion del material con el valor medio
+    del parametro entre la superficie y la punta de la grieta. Todas las 
+    longitudes se interpolan con una sola llamada.
+    
+    INPUT:   v_ai    = (m) vector de longitudes de grieta de iniciacion
+             x       = (m) vector de distancias a la superficie
+             param   = vector con los FS o SWT en cada punto
+             function_interp = funcion de interpolacion de las curvas de 
+                               iniciacion (ver interpolador_tabla)
+             
+    OUTPUTS: N_i     = vector de ciclos de iniciacion"""
+    
+    v_ai = np.asarray(v_ai, dtype=float)
+    
+    #Indice asociado a cada longitud de grieta, el primer punto con x >= a,
+    #igual que indice_a
+    v_ind_a = np.searchsorted(np.round(x, 8), np.round(v_ai, 8))
+    
+    #Valor medio del parametro hasta cada indice para la interpolacion
+    param_med = np.cumsum(param)[v_ind_a]/(v_ind_a + 1.0)
+    
+    #Realizamos la interpolacion para calcular los ciclos de iniciacion. La
+    #interpolacion no da valores menores que 0
+    N_i = function_interp(v_ai, param_med)
+            
+    return N_i
+
+###############################################################################
+###############################################################################
+
+def convergencia_resolucion(x, sxx_max, param, function_interp, ac, W, MAT,
+                            tol=1e-3, n_div=16, n_niveles=10):
+    """Elige el paso entre longitudes de iniciacion y la resolucion de la 
+    propagacion independientemente de la malla de elementos finitos. La
+    propagacion se integra con paso adaptativo y K_I con cuadratura de Gauss
+    (ver curva_propagacion_continua), de forma que su resolucion la fija la 
+    tolerancia de la integracion. En cada nivel el paso entre longitudes de
+    iniciacion se divide por dos y la tolerancia por cuatro hasta que el 
+    error de N_t_min estimado por extrapolacion de Richardson es menor que 
+    tol y a_inic cambia menos que el paso del nivel anterior.
+    
+    Si se alcanza n_niveles sin convergencia, o la integracion de la 
+    propagacion falla al refinar (ver IntegracionFallida), se devuelve el 
+    ultimo nivel calculado con convergido = False en el historial y se 
+    avisa.
+    
+    INPUT:   x         = (m) vector de distancias a la superficie
+             sxx_max   = (MPa) vector de tensiones máximas en la direccion x
+             param     = vector con los FS o SWT en cada punto
+             function_interp = funcion de interpolacion de las curvas de 
+                               iniciacion
+             ac        = propagacion plana o eliptica
+             W         = (m) anchura del especimen
+             MAT       = indice asignado al material
+             tol       = tolerancia relativa de N_t_min
+             n_div     = numero de longitudes de iniciacion del primer nivel
+             n_niveles = numero maximo de niveles de refinamiento
+             
+    OUTPUTS: v_ai      = (m) vector de longitudes de iniciacion elegido
+             N_i       = vector de ciclos de iniciacion
+             N_p       = vector de ciclos de propagacion
+             historial = lista con un diccionario por nivel con el paso de 
+                         a_i (h), la tolerancia de la propagacion (rtol), 
+                         N_t_min, a_inic, el error estimado de N_t_min y si
+                         el nivel cumple el criterio de convergencia 
+                         (convergido)"""
+    
+    a_i_min = round(x[1], 8)
+    a_i_max = round(x[-1], 8)
+    
+    h    = (a_i_max - a_i_min)/n_div  #Paso entre longitudes de iniciacion
+    rtol = 1e-3                       #Tolerancia de la propagacion
+    
+    historial = []
+    for nivel in range(n_niveles):
+        v_ai = np.arange(a_i_min, a_i_max, h)
+        try:
+            N_p = curva_propagacion_continua(sxx_max, x, v_ai, ac, h, W, MAT,
+                                             rtol=rtol, cuadratura="gauss")
+        except IntegracionFallida as fallo:
+            #Sin ningun nivel calculado no hay resultado que devolver
+            if not historial:
+                raise
+            warnings.warn("convergencia_resolucion: fallo de la propagacion "
+                          "en el nivel {} ({}). Se devuelve el nivel {} sin "
+                          "convergencia".format(nivel, fallo, nivel - 1),
+                          RuntimeWarning)
+            break
+        N_i  = ciclos_iniciacion(v_ai, x, param, function_interp)
+        N_t  = N_i + N_p
+        
+        N_t_min = np.min(N_t)
+        a_inic  = v_ai[np.argmin(N_t)]
+        
+        #Error de Richardson del nivel suponiendo convergencia de primer 
+        #orden en h
+        if historial:
+            error = abs(N_t_min - historial[-1]["N_t_min"])/N_t_min
+        else:
+            error = np.inf
+            
+        #El nivel converge si el error es menor que tol y a_inic cambia menos
+        #que el paso del nivel anterior
+        convergido = bool(error < tol 
+                          and abs(a_inic - historial[-1]["a_inic"]) 
+                          <= historial[-1]["h"])
+        historial.append({"nivel": nivel, "h": h, "rtol": rtol, 
+                          "N_t_min": N_t_min, "a_inic": a_inic, 
+                          "error": error, "convergido": convergido})
+        resultado = (v_ai, N_i, N_p)
+        
+        if convergido:
+            break
+        
+        h    /= 2.0
+        rtol /= 4.0
+    
+    else:
+        warnings.warn("convergencia_resolucion: no se alcanza la tolerancia "
+                      "{:.1e} en {} niveles (error {:.2e})".format(
+                          tol, n_niveles, historial[-1]["error"]),
+                      RuntimeWarning)
+        
+    return resultado + (historial,)
+        
+###############################################################################
+###############################################################################
+
+def principal(par, W, MAT,ac,trat,exp_max, exp_min, resolucion="malla",
+              tol=1e-3, da_curvas=1e-5, malla_curvas=None, 
+              modo_iniciacion="tabla"):
     """Estima la vida a fatiga.
     
-    INPUTS:  par     = parametro para el modelo de iniciacion
+    INPUTS:  par     = parametro para el modelo de iniciacion ('FS' o 
+                       'SWT'). Para varios parametros a la vez ver 
+                       principal_criterios
              W       = (m) anchura del especimen        
-             MAT     = indice asignado al material
+             MAT     = indice asignado al material o nombre del material en
+                       la biblioteca de materiales (ver biblioteca). Con un
+                       nombre se utilizan las tablas ya calculadas del 
+                       material
              ac      = propagacion plana o eliptica
              trat    = tratamiento superficial
              exp_max = nombre del archivo con la tensiones y defs maximas
              exp_min = nombre del archivo con la tensiones y defs minimas
+             resolucion = "malla" --> el paso entre longitudes de iniciacion
+                          y el de la propagacion son el paso de la malla
+                          "auto" --> el paso entre longitudes de iniciacion
+                          y la resolucion de la propagacion se eligen 
+                          refinando hasta la convergencia (ver 
+                          convergencia_resolucion)
+             tol     = tolerancia relativa de la convergencia de N_t_min
+             da_curvas = paso de la propagacion de las curvas de iniciacion.
+                       La tabla se toma de la cache de tablas (ver 
+                       cache_tablas) y se calcula si no existe
+             malla_curvas = malla de las curvas de iniciacion (ver 
+                       MALLA_INICIACION y MALLA_ADAPTATIVA). La malla puede
+                       ser no uniforme
+             modo_iniciacion = "tabla" --> los ciclos de iniciacion se 
+                       interpolan en la tabla de curvas de iniciacion
+                       "exacta" --> los ciclos de iniciacion se calculan 
+                       solo en los puntos necesarios, sin tabla ni error de
+                       interpolacion (ver SuperficieIniciacion)
             
     OUTPUTS: resultados.dat = actualiza el archivo de resultados con la
              longitud de iniciacion y los ciclos de iniciacion, propagacion y 
              total para que se produzca el fallo
-             a_inic         = longitud de grieta de iniciación
+             a_inic         = longitud de grieta de iniciación (nan si la 
+                              grieta se detiene para todas las longitudes:
+                              run-out)
              v_ai_mm        = vector de longitudes de grietas en mm 
-             N_t_min        = Ciclos de iniciación
+             N_t_min        = Ciclos de iniciación (inf en un run-out)
              N_t            = Vector de ciclos totales
              N_p            = Vector de ciclos de propagación   
              N_i            = Vector de ciclos de iniciación
              N_a            = Vector de ciclos de propagación a partir de la iniciación
              exp_id.dat     = archivo con los datos de las curvas de vida"""
 
+    return principal_criterios([par], W, MAT, ac, trat, exp_max, exp_min,
+                               resolucion, tol, da_curvas, malla_curvas,
+                               modo_iniciacion)[par]
+
+###############################################################################
+###############################################################################
+
+def principal_criterios(v_par, W, MAT, ac, trat, exp_max, exp_min, 
+                        resolucion="malla", tol=1e-3, da_curvas=1e-5, 
+                        malla_curvas=None, modo_iniciacion="tabla"):
+    """Estima la vida a fatiga de un experimento con varios parametros de 
+    iniciacion. Los datos experimentales, los tensores y el plano critico 
+    (ver parametros) y la propagacion se calculan una sola vez para todos 
+    los parametros.
+    
+    INPUTS:  v_par   = lista de parametros para el modelo de iniciacion
+             W, MAT, ac, trat, exp_max, exp_min, resolucion, tol, 
+             da_curvas, malla_curvas, modo_iniciacion = ver principal
+             
+    OUTPUTS: resultados = diccionario con los resultados de cada parametro,
+                          (a_inic, v_ai_mm, N_t_min, N_t, N_p, N_i, N_a) 
+                          (ver principal). Se actualizan los mismos 
+                          archivos que con principal"""
              
     print('Datos Experimentales:\n    {}.dat\n    {}.dat\n'.format(exp_max,
                                                                    exp_min))
@@ -221,135 +494,189 @@ def principal(par, W, MAT,ac,trat,exp_max, exp_min):
     #Obtenemos las rutas a las carpetas necesarias para los calculos 
     cwd         = os.getcwd()
     ruta_exp    = cwd + '/datos_experimentales/{}'.format(trat)
-    ruta_curvas = cwd + '/curvas_inic/{}'.format(ac)
-    ruta_datos  = cwd + '/resultados/{}/datos/{}'.format(trat,par)
+    #Material de la biblioteca y sus tablas de curvas de iniciacion
+    entrada = biblioteca()[MAT] if isinstance(MAT, str) else None
+    MAT     = como_material(MAT) if entrada is None else entrada.MAT
              
-    #Cargamos los datos de las curvas de iniciación del material
-    data_interp = np.loadtxt("{}/MAT_{}.dat".format(ruta_curvas, par))  
-    
-    #Separamos las curvas en las variables necesarias
-    x_interp = data_interp[0,1:] #Eje x de la matriz de interpolación 
-    y_interp = data_interp[1:,0]          #Eje y de la matriz de interpolación
-    m_N_i    = data_interp[1:,1:]          #Matriz con los ciclos de iniciación
-    
-    
-    
-    #Creamos la función de interpolación
-    function_interp = interp2d(x_interp, y_interp, m_N_i, kind='quintic', 
-                               bounds_error=False)
-                       
-    #Cargamos los datos experimentales y generamos el vector de FS o SWT
+    #Cargamos los datos experimentales y generamos los vectores de FS o SWT.
+    #Los tensores y el plano critico se calculan una sola vez para todos 
+    #los parametros
     x, sxx_max, s_max, e_max, e_min = lectura_datos(ruta_exp, exp_max,
                                                              exp_min)
-    param = parametro(par, MAT, x, s_max, e_max, e_min)
+    v_param = parametros(v_par, MAT, x, s_max, e_max, e_min)
     
     a_i_min = round(x[1], 8) #Tamaño mínimo de longitud de grieta de
                              #iniciacion. Redondeamos para evitar errores
                              #numericos.
     a_i_max = round(x[-1], 8) #Tamaño máximo de longitud de grieta de iniciacion
-    da      = a_i_min      #Paso entre longitudes de grietas
-    
-    #Creamos el vector de longitudes de grieta de iniciacion
-    
-    v_ai = np.arange(a_i_min,a_i_max, da)#Vector de longitudes de grieta en m
-    v_ai_mm = v_ai*1e3          #Vector de longitudes de grieta en mm
-    
-    #Calculamos los ciclos de iniciación, de propagación y totales para cada
-    #longitud de grieta de iniciacion   
-    #Inicializamos los ciclos
-    N_i= np.zeros_like(v_ai)
-    N_p= np.zeros_like(v_ai)
-    N_t= np.zeros_like(v_ai)
-
-    for i,a in enumerate(v_ai):
-        ind_a     = indice_a(a, x) #Indice asociado a esa longitud de grieta
-        param_med = np.mean(param[:ind_a + 1]) #Valor medio del parametro para la interpolacion
-                           
-        #Realizamos la interpolacion para calcular los ciclos de iniciacion
-        N_i[i] = function_interp(a, param_med)[0] 
-
-        #La interpolacion puede dar valores menores que 0 para ciclos muy bajos
-        if N_i[i] < 0:
-            N_i[i] = 0
+    
+    #Los ciclos de propagacion no dependen del parametro de iniciacion. Las
+    #curvas de propagacion se guardan en cache_curvas (ver propagacion), de
+    #forma que el segundo parametro reutiliza la propagacion del primero. 
+    #Las tablas de curvas de iniciacion son propias de cada parametro
+    resultados = {}
+    for par in v_par:
+        ruta_datos = cwd + '/resultados/{}/datos/{}'.format(trat,par)
+        param      = v_param[par]
+        
+        if modo_iniciacion == "exacta":
+            #Los ciclos de iniciacion se calculan bajo demanda en los puntos que
+            #se necesitan y se guardan para los siguientes calculos
+            function_interp = SuperficieIniciacion(par, ac, da_curvas, W, MAT)
+        else:
+            #Cargamos los datos de las curvas de iniciación del material. La 
+            #tabla corresponde siempre al material, la geometria y el espesor 
+            #del calculo
+            if entrada is not None:
+                ruta_curvas = entrada.tabla(par, ac, da_curvas, W, malla_curvas)
+            else:
+                ruta_curvas = obtener_tablas(par, da_curvas, ac, W, MAT,
+                                             malla=malla_curvas)[ac]
         
-        #Calculamos los ciclos de propagacion
-        N_p[i] = fase_propagacion(sxx_max, ind_a, a,ac, da, W, MAT) 
+            #Creamos la función de interpolación. Se construye una vez por tabla
+            #y se reutiliza en los siguientes calculos con la misma tabla
+            function_interp = interpolador_tabla(ruta_curvas)
+                       
+        #Calculamos los ciclos de iniciación, de propagación y totales para cada
+        #longitud de grieta de iniciacion   
+        if resolucion == "auto":
+            #El paso entre longitudes de iniciacion y el de la propagacion se 
+            #refinan hasta que el resultado converge
+            v_ai, N_i, N_p, historial = convergencia_resolucion(x, sxx_max, 
+                                            param, function_interp, ac, W, MAT,
+                                            tol=tol)
+            print('Resolucion elegida: paso de a_i {:.3e} m, tolerancia de la '
+                  'propagacion {:.1e}{}'.format(historial[-1]["h"], 
+                                              historial[-1]["rtol"],
+                                              '' if historial[-1]["convergido"]
+                                              else ' (sin convergencia)'))
+            print('{:<6}{:<12}{:<12}{:<14}{:<12}{:<10}'.format('nivel', 'h (m)', 
+                  'rtol', 'N_t_min', 'a_inic (mm)', 'error'))
+            for paso in historial:
+                print('{:<6}{:<12.3e}{:<12.1e}{:<14.6e}{:<12.4f}{:<10.2e}'.format(
+                      paso["nivel"], paso["h"], paso["rtol"], paso["N_t_min"],
+                      paso["a_inic"]*1e3, paso["error"]))
+        else:
+            da      = a_i_min      #Paso entre longitudes de grietas
         
-        #Ciclos totales
-        N_t[i] = N_i[i]+N_p[i]
+            #Creamos el vector de longitudes de grieta de iniciacion
+            v_ai = np.arange(a_i_min,a_i_max, da)#Vector de longitudes de grieta en m
         
+            #Indices asociados a cada longitud de grieta
+            v_ind_a = np.array([indice_a(a, x) for a in v_ai])
     
-    #Calculamos el numero de ciclos hasta el fallo y la longitud de iniciación
-    #de la grieta, que se producen en el mínimo de la curva de ciclos totales
-    N_t_min   = np.min(N_t)
-    i_N_t_min = np.argmin(N_t)
-    N_i_min   = N_i[i_N_t_min]
-    N_p_min   = N_p[i_N_t_min]
-    a_inic    = v_ai_mm[i_N_t_min]
+            #Calculamos los ciclos de propagacion de todas las longitudes de 
+            #iniciacion con una unica integracion
+            N_p = curva_propagacion(sxx_max, v_ind_a, ac, da, W, MAT)
+            N_i = ciclos_iniciacion(v_ai, x, param, function_interp)
+        
+        v_ai_mm = v_ai*1e3          #Vector de longitudes de grieta en mm
+    
+        #Ciclos totales. Las grietas que se detienen antes de romper tienen 
+        #ciclos de propagacion infinitos y no intervienen en el minimo
+        N_t = N_i + N_p
+    
+        #Calculamos el numero de ciclos hasta el fallo y la longitud de iniciación
+        #de la grieta, que se producen en el mínimo de la curva de ciclos totales.
+        #Si la grieta se detiene para todas las longitudes de iniciacion el 
+        #experimento no rompe (run-out): la vida es infinita y no hay longitud
+        #de iniciacion ni reparto entre iniciacion y propagacion
+        N_t_min   = np.min(N_t)
+        runout    = not np.isfinite(N_t_min)
+        if runout:
+            print('La grieta se detiene para todas las longitudes de iniciacion: '
+                  'vida infinita')
+            i_N_t_min = None
+            N_i_min   = np.nan
+            N_p_min   = np.inf
+            a_inic    = np.nan
+        else:
+            i_N_t_min = np.argmin(N_t)
+            N_i_min   = N_i[i_N_t_min]
+            N_p_min   = N_p[i_N_t_min]
+            a_inic    = v_ai_mm[i_N_t_min]
     
 
-    #Pintamos la figura con la evolucion de la longitud de grieta y guardamos
-    #en un archivo los datos
-    ciclos = open(ruta_datos + '/{}.dat'.format(exp_id), 'w')
-    ciclos.write('{:<5}\t{:<12}\t{:<12}\t{:<12}\t{:<12}'.format('a_i', 'N_t', 
-                                                                'N_i', 'N_p', 
-                                                                'N_a'))
-    
-    N_a = []               #Vector de ciclos con la evolución de la grieta
+        #Pintamos la figura con la evolucion de la longitud de grieta y guardamos
+        #en un archivo los datos
+        ciclos = open(ruta_datos + '/{}.dat'.format(exp_id), 'w')
+        ciclos.write('{:<5}\t{:<12}\t{:<12}\t{:<12}\t{:<12}'.format('a_i', 'N_t', 
+                                                                    'N_i', 'N_p', 
+                                                                    'N_a'))
+    
+        N_a = []               #Vector de ciclos con la evolución de la grieta
+        j   = i_N_t_min        #Ultima longitud con ciclos de propagacion finitos
 
-    for i,ai in enumerate(v_ai):
-        #Hasta la longitud de iniciacion crece como los ciclos de iniciacion
-        if ai <= a_inic*1e-3:
-            n_a = N_i[i]
+        for i,ai in enumerate(v_ai):
+            #Sin rotura la grieta no evoluciona
+            if runout:
+                n_a = np.inf
+            #Hasta la longitud de iniciacion crece como los ciclos de iniciacion
+            elif i <= i_N_t_min:
+                n_a = N_i[i]
+            #A partir de la longitud de iniciacion crece de acuerdo con los ciclos
+            #de propagacion. Las longitudes en las que la grieta se detendria 
+            #(propagacion infinita) no acumulan ciclos y la evolucion continua 
+            #desde la ultima longitud con propagacion finita
+            elif np.isfinite(N_p[i]):
+                n_a = N_a[j] + N_p[j] - N_p[i]
+                j   = i
+            else:
+                n_a = np.nan
             N_a.append(n_a)
-        #A partir de la longitud de iniciacion crece de acuerdo con los ciclos
-        #de propagacion
-        else:
-            n_a = N_a[-1] + N_p[i-1] - N_p[i]
-            N_a.append(n_a)
-        n_i = N_i[i]
-        n_p = N_p[i]
+            n_i = N_i[i]
+            n_p = N_p[i]
         
-        ciclos.write('\n{:.3f}\t{:.6e}\t{:.6e}\t{:.6e}\t{:.6e}'.format(ai*1e3,
-                     n_i+n_p, n_i, n_p, n_a))            
-    ciclos.close()
+            ciclos.write('\n{:.3f}\t{:.6e}\t{:.6e}\t{:.6e}\t{:.6e}'.format(ai*1e3,
+                         n_i+n_p, n_i, n_p, n_a))            
+        ciclos.close()
             
    
-    lines = np.loadtxt('resultados_generales/resultados_{}.dat'.format(trat), dtype = str, skiprows = 1).tolist()
-    # Se reescriben las lineas que ya estaban en el archivo. EL if else es debido
-    # a que el formato de lines varía según haya una línea de resultados escrita 
-    # o mas de una.
+        lines = np.loadtxt('resultados_generales/resultados_{}.dat'.format(trat), dtype = str, skiprows = 1).tolist()
+        # Se reescriben las lineas que ya estaban en el archivo. EL if else es debido
+        # a que el formato de lines varía según haya una línea de resultados escrita 
+        # o mas de una.
     
-    results = open('resultados_generales/resultados_{}.dat'.format(trat), 'w')
-    results.write('{:<13}\t{:<}\t{:<12}\t{:<12}\t{:<12}\t{:<5}\t{:<5}\t{:<}'.format('exp_id', 
-                  'param', 'N_t_min', 'N_i_min', 'N_p_min', '% N_i', '% N_p', 'a_inic (mm)'))
+        results = open('resultados_generales/resultados_{}.dat'.format(trat), 'w')
+        results.write('{:<13}\t{:<}\t{:<12}\t{:<12}\t{:<12}\t{:<5}\t{:<5}\t{:<}'.format('exp_id', 
+                      'param', 'N_t_min', 'N_i_min', 'N_p_min', '% N_i', '% N_p', 'a_inic (mm)'))
     
 
     
-    if len(lines[0][0]) == 1:
-        #Solo se escriben los resultados que no pertenezcan al calculo actual
-        if lines[0] != exp_id or lines[1] != par:
-            results.write('\n')
-            for j in i:
-                results.write('{}\t'.format(j))
-    else:
-        for i in lines:
+        if len(lines[0][0]) == 1:
             #Solo se escriben los resultados que no pertenezcan al calculo actual
-            if i[0] != exp_id or i[1] != par:
+            if lines[0] != exp_id or lines[1] != par:
                 results.write('\n')
                 for j in i:
                     results.write('{}\t'.format(j))
+        else:
+            for i in lines:
+                #Solo se escriben los resultados que no pertenezcan al calculo actual
+                if i[0] != exp_id or i[1] != par:
+                    results.write('\n')
+                    for j in i:
+                        results.write('{}\t'.format(j))
                     
-    #Se escribe en el archivo el calculo actual
-    results.write('\n{}\t{}\t{:.6e}\t{:.6e}\t{:.6e}\t{:.1%}\t{:.1%}\t{:.3f}'.format(exp_id, par, 
-                  N_t_min, N_i_min, N_p_min, float(N_i_min)/N_t_min, 
-                  float(N_p_min)/N_t_min, a_inic))
-    results.close()
+        #Se escribe en el archivo el calculo actual. Un run-out se marca con
+        #vida infinita y sin reparto ni longitud de iniciacion
+        if runout:
+            results.write('\n{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}'.format(exp_id, par,
+                          'inf', '-', 'inf', '-', '-', '-'))
+        else:
+            results.write('\n{}\t{}\t{:.6e}\t{:.6e}\t{:.6e}\t{:.1%}\t{:.1%}\t{:.3f}'.format(exp_id, par, 
+                          N_t_min, N_i_min, N_p_min, float(N_i_min)/N_t_min, 
+                          float(N_p_min)/N_t_min, a_inic))
+        results.close()
       
-    print('Longitud de iniciación de la grieta: {} mm'.format(a_inic))
-    print('Numero de ciclos hasta el fallo: {}\n'.format(N_t_min))
+        if runout:
+            print('Run-out: la grieta no rompe el especimen\n')
+        else:
+            print('Longitud de iniciación de la grieta: {} mm'.format(a_inic))
+            print('Numero de ciclos hasta el fallo: {}\n'.format(N_t_min))
 
-    return a_inic,v_ai_mm, N_t_min,N_t,N_p, N_i, N_a
+        resultados[par] = (a_inic,v_ai_mm, N_t_min,N_t,N_p, N_i, N_a)
+        
+    return resultados
     
 def pintar_grafica_a_N(N_a, v_ai_mm,par,exp_id):
     fig = plt.figure('Longitud de grieta_{}_{}'.format(par,exp_id))
@@ -383,13 +710,17 @@ def pintar_grafica_iniciacion(a_inic,v_ai_mm, N_t_min,N_t,N_p, N_i,par,trat, exp
     plt.plot(v_ai_mm, N_i, 'b')
     plt.plot(v_ai_mm, N_p, 'k')
     plt.plot(v_ai_mm, N_t, 'r')
-    plt.plot(a_inic, N_t_min, 'g^')
     plt.ylim([1e3,1e8])
-    plt.legend(["Iniciación","Propagación" , "Total","Punto de iniciación"])
-    plt.annotate(s="a_inic: {:.3f} mm\nN_inic: {:.0f}".format(a_inic,np.floor(N_t_min)),
-                xy =(a_inic,N_t_min),
-                xytext =(1,1e7), 
-                arrowprops=dict(facecolor ="blue",width=0.1,headwidth =0.2))
+    #En un run-out no hay punto de iniciacion
+    if np.isfinite(N_t_min):
+        plt.plot(a_inic, N_t_min, 'g^')
+        plt.legend(["Iniciación","Propagación" , "Total","Punto de iniciación"])
+        plt.annotate(s="a_inic: {:.3f} mm\nN_inic: {:.0f}".format(a_inic,np.floor(N_t_min)),
+                    xy =(a_inic,N_t_min),
+                    xytext =(1,1e7), 
+                    arrowprops=dict(facecolor ="blue",width=0.1,headwidth =0.2))
+    else:
+        plt.legend(["Iniciación","Propagación" , "Total"])
     plt.savefig("resultados/{}/grafs/{}/{}.png".format(trat,par,exp_id))
     return fig
     
@@ -7,174 +7,1320 @@ Created on:
 
 
 import numpy as np
-from scipy.integrate import quad
-
-MAT = {"C"     :8.83e-11,
-    "n"        : 3.322,
-    "f"        : 2.5,
-    "l_0"      : 25e-6,
-    "sigma_fl" : 169.0,
-    "K_th"     : 2.2,
-    "K_IC"     : 29.0,
-    "sigma_y"  : 503.0,
-    "sigma_f"  : 1610.0,
-    "E"        : 71000.0,
-    "nu"       : 0.33,
-    "b"        : -.1553}
-MAT["G"]= MAT["E"]/(2.0*(1.0 + MAT["nu"]))
-MAT["a_0"] =1/np.pi*(MAT["K_th"]/(MAT["sigma_fl"]))**2.0
+import hashlib
+import warnings
+from functools import lru_cache, wraps
+from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
+from scipy.special import ellipe
+from nucleos import nucleo
+from material import Material, como_material
+
+#Aluminio 7075-T651. G y a_0 se calculan al crear el material
+MAT = Material(C        = 8.83e-11,
+               n        = 3.322,
+               f        = 2.5,
+               l_0      = 25e-6,
+               sigma_fl = 169.0,
+               K_th     = 2.2,
+               K_IC     = 29.0,
+               sigma_y  = 503.0,
+               sigma_f  = 1610.0,
+               E        = 71000.0,
+               nu       = 0.33,
+               b        = -.1553)
+
+#Puntos de Gauss por panel de K_I_gauss y error relativo estimado de la
+#cuadratura a partir del cual se avisa
+N_GAUSS   = 4
+TOL_GAUSS = 1e-6
    
 
 ###############################################################################
 ###############################################################################
 
-def K_I(sigma, a, ds, W):
+def pesos_KI(k, a, n, ds, W):
+    """Devuelve los pesos con los que contribuye cada nodo de un perfil de 
+    tensiones al factor de intensidad de tensiones, utilizando la función de
+    peso de Bueckner y la regla del punto medio en cada intervalo.
+    
+    INPUTS: k     = indice del nodo de la punta de la grieta (ndarray)
+            a     = (m) longitud de la grieta (ndarray del tamaño de k)
+            n     = numero de nodos del perfil de tensiones
+            ds    = (m) paso entre nodos del perfil
+            W     = (m) espesor del especimen
+            
+    OUTPUT: pesos = (m^0.5) matriz (len(k) x n) de forma que K_I = pesos@sigma"""
+    
+    k = np.asarray(k, dtype=int)[:, None]
+    a = np.asarray(a, dtype=float)[:, None]
+    j = np.arange(n - 1)
+    
+    #Funciones de peso
+    m1 = 0.6147 + 17.1844*(a/W)**2.0 + 8.7822*(a/W)**6.0
+    m2 = 0.2502 + 3.2889*(a/W)**2.0 + 70.0444*(a/W)**6.0
+    
+    #Distancia desde la punta de la grieta al punto medio de cada intervalo.
+    #Solo los intervalos entre la superficie y la punta pertenecen a la grieta
+    valido = j < k
+    s      = np.where(valido, (k - j - 0.5)*ds, ds)
+    a      = np.where(a > 0.0, a, ds)
+    w      = np.where(valido, 1.0/s**0.5*(1.0 + m1*s/a + m2*(s/a)**2.0), 0.0)
+    
+    #La tension de cada intervalo es la media de sus nodos, por lo que cada
+    #intervalo reparte su peso a partes iguales entre ellos
+    w     *= (2.0/np.pi)**0.5*ds/2.0
+    pesos  = np.zeros((k.shape[0], n))
+    pesos[:, :-1] += w
+    pesos[:, 1:]  += w
+    
+    return pesos
+
+###############################################################################
+###############################################################################
+
+@lru_cache(maxsize=32)
+def matriz_influencia(n, ds, W):
+    """Devuelve la matriz de influencia de la función de peso para un perfil
+    de n nodos con paso ds. La fila k contiene la contribución de cada nodo al
+    K_I de una grieta con la punta en el nodo k (a = k*ds), por lo que el K_I 
+    de todas las longitudes de grieta de uno o varios perfiles se obtiene con
+    un producto de matrices. El resultado se guarda en memoria para cada 
+    combinacion de argumentos.
+    
+    INPUTS: n     = numero de nodos del perfil de tensiones
+            ds    = (m) paso entre nodos del perfil
+            W     = (m) espesor del especimen
+            
+    OUTPUT: G     = (m^0.5) matriz de influencia (n x n) de solo lectura"""
+    
+    k = np.arange(n)
+    G = pesos_KI(k, k*ds, n, ds, W)
+    G.setflags(write=False)
+    
+    return G
+
+###############################################################################
+###############################################################################
+
+def K_I_uniforme(sigma, a, W):
+    """Devuelve el factor de intensidad de tensiones para una tension uniforme
+    en toda la grieta. La integral de la función de peso de Bueckner es 
+    analitica en este caso:
+        
+        K_I = (2/pi)^0.5*sigma*a^0.5*(2 + 2/3*m1 + 2/5*m2)
+    
+    INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
+            a     = (m) longitud de la grieta (float o ndarray)
+            W     = (m) espesor del especimen
+            
+    OUTPUT: K_I   = (MPa m^0.5) factor de intensidad de tensiones"""
+    
+    a = np.asarray(a, dtype=float)
+    
+    #Funciones de peso
+    m1 = 0.6147 + 17.1844*(a/W)**2.0 + 8.7822*(a/W)**6.0
+    m2 = 0.2502 + 3.2889*(a/W)**2.0 + 70.0444*(a/W)**6.0
+    
+    K_I = (2.0/np.pi)**0.5*sigma*a**0.5*(2.0 + 2.0/3.0*m1 + 2.0/5.0*m2)
+    
+    if K_I.ndim == 0:
+        K_I = float(K_I)
+        
+    return K_I
+
+###############################################################################
+###############################################################################
+
+def K_I(sigma, a, ds, W, cuadratura="punto_medio", n_gauss=N_GAUSS,
+        paneles=None):
     """Devuelve el factor de instensidad de tensiones para un tamaño de grieta
     determinado utilizando una función de peso propuesta por Bueckner.
     
+    El cálculo está vectorizado: a puede ser un único tamaño de grieta o un 
+    vector de tamaños, en cuyo caso se devuelve un vector con un K_I para cada
+    uno de ellos.
+    
     INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
-                    (float) --> fase de iniciación
-                    (list)  --> fase de propagación
-            a     = (m) longitud de la grieta
+                    (float)   --> tension uniforme, fase de iniciación
+                                  (ver K_I_uniforme)
+                    (ndarray) --> perfil de tensiones desde la superficie 
+                                  con paso ds, fase de propagación. Puede ser
+                                  una matriz con un perfil por fila
+            a     = (m) longitud de la grieta (float o ndarray)
             ds    = (m) paso de longitudes de grieta
             W     = (m) espesor del especimen
+            cuadratura = "punto_medio" --> regla del punto medio en cada 
+                         intervalo del perfil
+                         "gauss" --> cuadratura de Gauss con eliminación de la 
+                         singularidad en los intervalos del perfil (ver 
+                         K_I_gauss). Si el error estimado supera TOL_GAUSS
+                         se avisa
+            n_gauss, paneles = puntos de Gauss por panel y numero de 
+                         paneles de la cuadratura de Gauss (ver K_I_gauss)
             
     OUTPUT: K_I   = (MPa m^0.5) factor de intensidad de tensiones"""
 
+    a = np.asarray(a, dtype=float)
+    
+    if cuadratura == "gauss" and np.ndim(sigma) == 1:
+        sigma = np.asarray(sigma, dtype=float)
+        n     = len(sigma)
+        k     = np.rint(a/ds)
+        
+        #Si las puntas de las grietas estan en los nodos del perfil y la 
+        #cuadratura es exacta (ver K_I_gauss), K_I es lineal en las tensiones
+        #de los nodos y se utilizan las filas de la matriz de influencia, 
+        #igual que con la regla del punto medio
+        if (paneles is None and n_gauss >= 4 and np.all(k < n)
+                and np.allclose(a, k*ds, rtol=0.0, atol=1e-9*ds)):
+            n_mat = 2**int(np.ceil(np.log2(max(n, 2))))
+            G     = matriz_influencia_gauss(n_mat, ds, W, n_gauss)
+            K_I   = G[k.astype(int), :n] @ sigma
+            if K_I.ndim == 0:
+                K_I = float(K_I)
+            return K_I
+        
+        x          = ds*np.arange(n)
+        K_I, error = K_I_gauss(sigma, a, W, x, n_gauss, paneles)
+        aviso_gauss(K_I, error)
+        return K_I
+    
+    #Si sigma es de tipo float, el cálculo es para la fase de iniciación y la
+    #integral tiene solucion analitica
+    if np.ndim(sigma) == 0:
+        K_I = K_I_uniforme(sigma, a, W)
+        
+    #Si sigma es un vector, el cálculo es para la fase de propagación. La
+    #punta de la grieta es el nodo del perfil más cercano a a y la tensión de 
+    #cada intervalo es la media de sus nodos.
+    else:
+        sigma = np.asarray(sigma, dtype=float)
+        n     = sigma.shape[-1]
+        v_a   = a.reshape(-1)
+        k     = np.rint(v_a/ds).astype(int)
+        
+        #Si todas las grietas terminan en nodos del perfil se utilizan las
+        #filas de la matriz de influencia, que se calculan con a = k*ds. Como
+        #la fila k solo depende de k, se reutiliza la matriz de un tamaño 
+        #mayor para perfiles de distinta longitud.
+        if np.all(k < n) and np.allclose(v_a, k*ds, rtol=0.0, atol=1e-9*ds):
+            n_mat = 2**int(np.ceil(np.log2(max(n, 2))))
+            pesos = matriz_influencia(n_mat, ds, W)[k, :n]
+        #Fuera de los nodos las funciones de peso se calculan con la longitud
+        #de cada grieta. Si la grieta supera el perfil, la punta se toma en 
+        #el ultimo nodo
+        else:
+            pesos = pesos_KI(np.minimum(k, n - 1), v_a, n, ds, W)
+            
+        K_I = (sigma @ pesos.T).reshape(sigma.shape[:-1] + a.shape)
+    
+        if K_I.ndim == 0:
+            K_I = float(K_I)
+    
+    return K_I
+        
+###############################################################################
+###############################################################################
+
+def K_I_interpolado(sigma, x, a, ds, W):
+    """Devuelve el factor de intensidad de tensiones de un perfil de tensiones
+    para una longitud de grieta cualquiera, no necesariamente en un nodo. La 
+    grieta se divide en intervalos iguales de ancho no mayor que ds y la 
+    tension en el punto medio de cada intervalo se interpola linealmente entre
+    los nodos del perfil. En los nodos coincide con K_I.
+    
+    INPUTS: sigma = (MPa) perfil de tensiones desde la superficie
+            x     = (m) profundidad de los nodos del perfil
+            a     = (m) longitud de la grieta
+            ds    = (m) ancho maximo de los intervalos de integracion
+            W     = (m) espesor del especimen
+            
+    OUTPUT: K_I   = (MPa m^0.5) factor de intensidad de tensiones"""
+    
     #Funciones de peso
     m1 = 0.6147 + 17.1844*(a/W)**2.0 + 8.7822*(a/W)**6.0
     m2 = 0.2502 + 3.2889*(a/W)**2.0 + 70.0444*(a/W)**6.0
+    
+    N = max(int(np.ceil(round(a/ds, 8))), 1)
+    h = a/N
+    s = h*(np.arange(N) + 0.5)
+    
+    #Tension a la distancia s de la punta de la grieta
+    s_med = np.interp(a - s, x, sigma)
+    
+    integral = np.sum(s_med/s**0.5*(1.0 + m1*s/a + m2*(s/a)**2.0))*h
+    
+    K_I = (2.0/np.pi)**0.5*integral
+    
+    return float(K_I)
 
-    def integr_KI(s, sx):
-        """Realiza el cálculo de la integral del FIT"""
-        
-        res = sx/s**0.5*(1.0 + m1*s/a + m2*(s/a)**2.0)
+###############################################################################
+###############################################################################
+
+@lru_cache(maxsize=16)
+def nodos_gauss(n):
+    """Devuelve los nodos y pesos de la cuadratura de Gauss-Legendre de n 
+    puntos en [-1, 1]."""
+    
+    return np.polynomial.legendre.leggauss(n)
+
+###############################################################################
+###############################################################################
+
+def K_I_gauss(sigma, a, W, x=None, n_gauss=N_GAUSS, paneles=None):
+    """Devuelve el factor de intensidad de tensiones y una estimación del 
+    error de la cuadratura. La singularidad 1/s^0.5 de la funcion de peso se
+    elimina con el cambio de variable s = t^2:
         
-        return res
+        int_0^a sigma(s)/s^0.5*(1 + m1*s/a + m2*(s/a)^2) ds 
+            = int_0^a^0.5 2*sigma(t^2)*(1 + m1*t^2/a + m2*t^4/a^2) dt
+    
+    y la integral resultante, que es regular, se calcula con Gauss-Legendre por 
+    paneles. Si los paneles coinciden con los intervalos del perfil, la 
+    tension es lineal en s en cada panel, el integrando es un polinomio de 
+    grado 6 en t y la cuadratura de 4 o mas puntos es exacta para el perfil
+    interpolado: el error estimado es 0 y se evalua una sola cuadratura. En
+    otro caso el error se estima comparando con la cuadratura de n_gauss 
+    puntos y se devuelve el resultado de 2*n_gauss puntos.
+    
+    El calculo esta vectorizado en a.
+    
+    INPUTS: sigma   = (MPa) tension perpendicular al plano de la grieta
+                      (float)   --> tension uniforme
+                      (ndarray) --> perfil de tensiones desde la superficie
+            a       = (m) longitud de la grieta (float o ndarray)
+            W       = (m) espesor del especimen
+            x       = (m) profundidad de los nodos del perfil de tensiones
+            n_gauss = numero de puntos de Gauss por panel
+            paneles = numero de paneles iguales en t. Si es None se utiliza
+                      un panel por cada intervalo del perfil
+            
+    OUTPUTS: K_I    = (MPa m^0.5) factor de intensidad de tensiones
+             error  = (MPa m^0.5) estimacion del error de la cuadratura"""
+    
+    a   = np.asarray(a, dtype=float)
+    v_a = a.reshape(-1, 1)
+    
+    #Funciones de peso
+    m1 = 0.6147 + 17.1844*(v_a/W)**2.0 + 8.7822*(v_a/W)**6.0
+    m2 = 0.2502 + 3.2889*(v_a/W)**2.0 + 70.0444*(v_a/W)**6.0
+    
+    #Con a = 0 todos los paneles tienen ancho nulo y K_I = 0
+    a_pos = np.where(v_a > 0.0, v_a, 1.0)
+    
+    #Limites de los paneles en la variable t = s^0.5. Los intervalos del 
+    #perfil se recortan a la grieta, de forma que los que quedan fuera de 
+    #ella tienen ancho nulo y no contribuyen
+    if paneles is not None:
+        t_pan = v_a**0.5*np.linspace(0.0, 1.0, paneles + 1)
+        t0, t1 = t_pan[:, :-1], t_pan[:, 1:]
+    elif np.ndim(sigma) == 0:
+        t0, t1 = np.zeros_like(v_a), v_a**0.5
+    else:
+        bordes = np.concatenate(([0.0], x, [np.inf]))
+        x_0    = np.clip(bordes[:-1], 0.0, v_a)
+        x_1    = np.clip(bordes[1:], 0.0, v_a)
+        t0, t1 = (v_a - x_1)**0.5, (v_a - x_0)**0.5
+    
+    def integral(n):
+        """Cuadratura de Gauss-Legendre de n puntos en todos los paneles"""
+        xi, w = nodos_gauss(n)
+        t     = ((t1 - t0)/2.0)[..., None]*xi + ((t1 + t0)/2.0)[..., None]
+        if np.ndim(sigma) == 0:
+            sig = sigma
+        else:
+            sig = np.interp(v_a[..., None] - t**2.0, x, sigma)
+        g = 2.0*sig*(1.0 + (m1/a_pos)[..., None]*t**2.0 
+                     + (m2/a_pos**2.0)[..., None]*t**4.0)
+        return np.sum((t1 - t0)/2.0*(g @ w), axis=-1)
+    
+    exacta = n_gauss >= 4 and (paneles is None or np.ndim(sigma) == 0)
+    
+    if exacta:
+        K_I   = (2.0/np.pi)**0.5*integral(n_gauss)
+        error = np.zeros_like(K_I)
+    else:
+        I_n   = integral(n_gauss)
+        I_2n  = integral(2*n_gauss)
+        K_I   = (2.0/np.pi)**0.5*I_2n
+        error = (2.0/np.pi)**0.5*np.abs(I_2n - I_n)
+    
+    K_I   = K_I.reshape(a.shape)
+    error = error.reshape(a.shape)
+    if K_I.ndim == 0:
+        K_I, error = float(K_I), float(error)
+    
+    return K_I, error
+
+@lru_cache(maxsize=32)
+def matriz_influencia_gauss(n, ds, W, n_gauss=N_GAUSS):
+    """Devuelve la matriz de influencia de K_I_gauss para un perfil de n 
+    nodos con paso ds, con un panel por intervalo del perfil. La fila k 
+    contiene la contribucion de cada nodo al K_I de una grieta con la punta
+    en el nodo k: en cada panel la tension es lineal entre sus dos nodos, 
+    por lo que cada punto de Gauss reparte su peso entre ellos. El resultado
+    se guarda en memoria para cada combinacion de argumentos.
+    
+    INPUTS: n       = numero de nodos del perfil de tensiones
+            ds      = (m) paso entre nodos del perfil
+            W       = (m) espesor del especimen
+            n_gauss = numero de puntos de Gauss por panel
+            
+    OUTPUT: G       = (m^0.5) matriz de influencia (n x n) de solo lectura"""
+    
+    xi, w = nodos_gauss(n_gauss)
+    G     = np.zeros((n, n))
+    j     = np.arange(n - 1)[None, :, None]
+    
+    #Se calcula por bloques de filas para limitar la memoria
+    for k0 in range(1, n, 128):
+        k = np.arange(k0, min(k0 + 128, n))[:, None, None]
+        a = k*ds
         
-    #Si sigma es de tipo float, el cálculo es para la fase de iniciación
-    if type(sigma) is not list:
+        #Funciones de peso
+        m1 = 0.6147 + 17.1844*(a/W)**2.0 + 8.7822*(a/W)**6.0
+        m2 = 0.2502 + 3.2889*(a/W)**2.0 + 70.0444*(a/W)**6.0
         
-        integral = 0.0
-        s        = ds/2.0
-        N        = int(round(a/ds, 8))
+        #Paneles de los intervalos de la grieta en t = s^0.5 y posicion 
+        #relativa de cada punto de Gauss en su intervalo
+        valido = j < k
+        t0     = np.where(valido, np.maximum(k - j - 1, 0)*ds, 0.0)**0.5
+        t1     = np.where(valido, (k - j)*ds, 0.0)**0.5
+        t      = (t1 - t0)/2.0*xi + (t1 + t0)/2.0
+        lam    = (a - t**2.0)/ds - j
+        g      = (t1 - t0)/2.0*w*2.0*(1.0 + m1*t**2.0/a + m2*t**4.0/a**2.0)
         
-        for i in range(N - 1):
-            integral += integr_KI(s, sigma)*ds
-            s        += ds       
+        filas = k[:, 0, 0]
+        G[filas, :-1] += np.sum(g*(1.0 - lam), axis=-1)
+        G[filas, 1:]  += np.sum(g*lam, axis=-1)
         
-        K_I      = (2.0/np.pi)**0.5*integral
+    G *= (2.0/np.pi)**0.5
+    G.setflags(write=False)
+    
+    return G
 
-    #Si sigma es de tipo list, el cálculo es para la fase de propagación
-    else:
-        integral = 0.0
-        s        = ds/2.0
-        
-        for i in sigma[:-1]:
-            j = sigma[sigma.index(i)+1]
-            integral += integr_KI(s, (i+j)/2.0)*ds
-            s        += ds
-            
-        K_I = (2.0/np.pi)**0.5*integral
+def aviso_gauss(K_I, error, tol=TOL_GAUSS):
+    """Avisa si el error estimado de la cuadratura de Gauss de K_I (ver 
+    K_I_gauss) supera la tolerancia relativa tol."""
     
-    return K_I
-        
+    rel = np.max(np.asarray(error)/np.maximum(np.abs(K_I), 1e-300))
+    if rel > tol:
+        warnings.warn("Error relativo estimado de la cuadratura de Gauss de "
+                      "K_I {:.2e} mayor que {:.0e}: aumentar n_gauss o "
+                      "paneles".format(rel, tol), RuntimeWarning, 
+                      stacklevel=3)
+
+###############################################################################
+###############################################################################
+
+@lru_cache(maxsize=256)
+def Phi_escalar(ac):
+    """Devuelve el factor Phi para una unica relacion entre semiejes. El 
+    resultado se guarda en memoria."""
+    
+    return float(ellipe(1.0 - ac**2.0))
+
 ###############################################################################
 ###############################################################################
 
 def Phi(ac = 0.5):
     """Devuelve el factor Phi calculado por Irwin para el caso de una grieta
-    elíptica.
+    elíptica. Es la integral elíptica completa de segunda especie
+    
+        Phi = int_0^pi/2 (1 - (1 - (a/c)^2)*sin(phi)^2)^0.5 dphi = E(1-(a/c)^2)
+    
+    que se evalua de forma exacta para cualquier relacion entre semiejes. Los
+    valores escalares se guardan en memoria y los vectores se evaluan de una 
+    vez.
     
-    INPUT:  ac  = a/c | relacion entre los semiejes
+    INPUT:  ac  = a/c | relacion entre los semiejes (float o ndarray). 
+                  Tambien admite "plana" o "eliptica"
 
     OUTPUT: Phi = factor de la grieta eliptica"""
     
-    #Calculo del factor para grietas elíptica
-    int_phi = lambda phi: np.sqrt(1.0 - (1.0 - (ac)**2.0)*(np.sin(phi))**2.0)
-    phi = quad(int_phi,0,np.pi/2)[0]
-    return phi       
+    ac = relacion_ac(ac)
+    
+    if np.ndim(ac) == 0:
+        return Phi_escalar(float(ac))
+    
+    ac = np.asarray(ac, dtype=float)
+    
+    return ellipe(1.0 - ac**2.0)
+    
+###############################################################################
+###############################################################################
+
+def relacion_ac(ac):
+    """Devuelve la relacion entre semiejes asociada al tipo de grieta.
+    
+    INPUT:  ac = plana o eliptica (o directamente el valor de a/c)
+
+    OUTPUT: ac = a/c | relacion entre los semiejes"""
+    
+    if isinstance(ac, str) and ac == "plana":
+        ac = 0.0
+    elif isinstance(ac, str) and ac == "eliptica":
+        ac = 0.5
         
+    return ac
+
+###############################################################################
+###############################################################################
+
+class GrietaDetenida(float):
+    """Resultado de la fase de propagacion de una grieta que no llega a
+    romper porque K_I cae por debajo del umbral de crecimiento antes de 
+    alcanzar K_IC (grieta no propagante del diagrama de Kitagawa-Takahashi).
+    Se comporta como un numero de ciclos infinito y guarda la longitud a la 
+    que se detiene la grieta en el atributo a_parada."""
+    
+    def __new__(cls, a_parada):
+        obj = super().__new__(cls, np.inf)
+        obj.a_parada = a_parada
+        return obj
+    
+    def __repr__(self):
+        return "GrietaDetenida(a_parada={:.3e})".format(self.a_parada)
+
+class IntegracionFallida(RuntimeError):
+    """Error de la integracion adaptativa del crecimiento de la grieta: el
+    integrador no termina en la rotura ni en la detencion de la grieta, por
+    lo que los ciclos integrados no son una vida de propagacion."""
+
+###############################################################################
+###############################################################################
+
+def umbral_propagacion(x, MAT):
+    """Devuelve el umbral de crecimiento de la grieta, aproximacion al 
+    diagrama de Kitagawa-Takahashi con el parametro de El Haddad.
+    
+    INPUTS: x      = (m) longitud de grieta (float o ndarray)
+            MAT    = indice asignado al material
+            
+    OUTPUT: umbral = (MPa m^0.5) umbral de crecimiento de la grieta"""
+    
+    MAT = como_material(MAT)
+    
+    x      = np.asarray(x, dtype=float)
+    umbral = nucleo("umbral")(x.reshape(-1), MAT.K_th, MAT.f, MAT.f_medio, 
+                              MAT.c_umbral)
+    umbral = umbral.reshape(x.shape)
+    
+    if umbral.ndim == 0:
+        umbral = float(umbral)
+    
+    return umbral
+
+@lru_cache(maxsize=64)
+def curva_umbral(MAT, da, n):
+    """Devuelve el umbral de crecimiento en los nodos da*[0, 1, ..., n-1] de
+    un perfil. Se calcula una sola vez por material y malla y el vector 
+    devuelto es de solo lectura.
+    
+    INPUTS: MAT    = material (Material)
+            da     = (m) paso de los nodos
+            n      = numero de nodos
+            
+    OUTPUT: umbral = (MPa m^0.5) vector de umbrales de crecimiento"""
     
+    umbral = umbral_propagacion(np.arange(n)*da, MAT)
+    umbral.setflags(write=False)
     
+    return umbral
+
 ###############################################################################
 ###############################################################################
 
-def fase_propagacion(sigma, ind_a, a_i, ac,da, W, MAT):
+def integr_ciclos(ki, x, MAT, umbral=None):
+    """Devuelve el integrando de los ciclos de propagacion, dN/da, conocido el
+    factor de intensidad de tensiones. Por debajo del umbral de El Haddad la 
+    grieta no crece y el integrando toma el valor 1e20.
+    
+    INPUTS: ki   = (MPa m^0.5) factor de intensidad de tensiones
+            x    = (m) longitud de grieta (float o ndarray)
+            MAT  = indice asignado al material
+            umbral = (MPa m^0.5) umbral de crecimiento en x, si ya se ha 
+                   calculado (ver curva_umbral)
+            
+    OUTPUT: res  = integrando de los ciclos de propagacion"""
+    
+    C    = MAT["C"]
+    n    = MAT["n"]
+    
+    if umbral is None:
+        umbral = umbral_propagacion(x, MAT)
+    
+    ki     = np.asarray(ki, dtype=float)
+    umbral = np.broadcast_to(umbral, ki.shape)
+
+    #Por debajo del umbral la grieta no crece
+    res = nucleo("velocidad")(ki.reshape(-1), umbral.reshape(-1), C, n)
+    res = res.reshape(ki.shape)
+    
+    if res.ndim == 0:
+        res = float(res)
+    
+    return res
+
+###############################################################################
+###############################################################################
+
+def integr_prop(x, s, phi, da, W, MAT, cuadratura="punto_medio", 
+                umbral=None, n_gauss=N_GAUSS, paneles=None):
+    """Realiza el cálculo del integrando de los ciclos de propagación.
+    
+    INPUTS: x    = (m) longitud de grieta (float o ndarray)
+            s    = (MPa) tension perpendicular al plano de la grieta
+            phi  = factor de la grieta eliptica
+            da   = (m) paso de longitudes de grietas
+            W    = (m) anchura del especimen
+            MAT  = indice asignado al material
+            cuadratura = cuadratura de la integral de K_I (ver K_I)
+            umbral = umbral de crecimiento en x (ver integr_ciclos)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
+            
+    OUTPUT: ki   = (MPa m^0.5) factor de intensidad de tensiones
+            res  = integrando de los ciclos de propagacion"""
+    
+    ki  = K_I(s, x, da, W, cuadratura, n_gauss, paneles)/phi
+    res = integr_ciclos(ki, x, MAT, umbral)
+    
+    return ki, res            
+
+###############################################################################
+###############################################################################
+
+def funcion_KI(sigma, phi, da, W, x=None, cuadratura="punto_medio",
+               n_gauss=N_GAUSS, paneles=None):
+    """Devuelve una funcion que calcula K_I/Phi para una longitud de grieta
+    cualquiera.
+    
+    INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
+                    (float)   --> tension uniforme
+                    (ndarray) --> perfil de tensiones desde la superficie
+            phi   = factor de la grieta eliptica
+            da    = (m) ancho maximo de los intervalos de la integral de K_I.
+                    Si no se indica x, es el paso de los nodos del perfil
+            W     = (m) anchura del especimen
+            x     = (m) profundidad de los nodos del perfil de tensiones
+            cuadratura = "punto_medio" --> K_I_interpolado
+                         "gauss" --> K_I_gauss. Si el error estimado supera
+                         TOL_GAUSS se avisa
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver 
+                         K_I_gauss)
+            
+    OUTPUT: ki    = funcion ki(a) (MPa m^0.5)"""
+    
+    if np.ndim(sigma) == 0:
+        def ki(a):
+            return K_I_uniforme(sigma, a, W)/phi
+    else:
+        sigma = np.asarray(sigma, dtype=float)
+        if x is None:
+            x = da*np.arange(len(sigma))
+        if cuadratura == "gauss":
+            def ki(a):
+                K, error = K_I_gauss(sigma, a, W, x, n_gauss, paneles)
+                aviso_gauss(K, error)
+                return K/phi
+        else:
+            def ki(a):
+                return K_I_interpolado(sigma, x, a, da, W)/phi
+            
+    return ki
+
+###############################################################################
+###############################################################################
+
+def historia_KI(sigma, a_i, v_phi, da, W, MAT, cuadratura="punto_medio",
+                n_gauss=N_GAUSS, paneles=None):
+    """Evalua por bloques de pasos la historia de K_I sin escalar desde a_i
+    hasta que la grieta de cada geometria rompe (K_I/phi alcanza K_IC) o se
+    detiene (K_I/phi cae por debajo del umbral de crecimiento antes de 
+    romper). Con un perfil de tensiones la historia continua más alla del 
+    ultimo nodo con el perfil completo, igual que la marcha de 
+    fase_propagacion y curva_propagacion. Es la comprobacion de detencion
+    comun a una y a varias geometrias.
+    
+    INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
+                    (float)   --> tension uniforme
+                    (ndarray) --> perfil de tensiones desde la superficie
+                                  con paso da
+            a_i   = (m) longitud inicial de la grieta
+            v_phi = lista de factores de la grieta eliptica
+            da    = (m) paso de longitudes de grietas
+            W     = (m) anchura del especimen
+            MAT   = indice asignado al material
+            cuadratura = cuadratura de la integral de K_I (ver K_I)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
+            
+    OUTPUT: v_a    = (m) vector de longitudes de la historia
+            v_K    = (MPa m^0.5) K_I sin escalar en v_a
+            rotura = lista con el indice del paso de rotura de cada 
+                     geometria (None si no rompe)
+            parada = lista con el indice del paso de detencion de cada 
+                     geometria (None si no se detiene)"""
+    
+    K_IC = MAT["K_IC"]
+    
+    if np.ndim(sigma) != 0:
+        sigma = np.asarray(sigma, dtype=float)
+    
+    n_bloque = 1024
+    v_a      = []
+    v_K      = []
+    rotura   = [None]*len(v_phi)
+    parada   = [None]*len(v_phi)
+    n        = 0
+    
+    while any(r is None and p is None for r, p in zip(rotura, parada)):
+        a_bloque = a_i + da*np.arange(n, n + n_bloque)
+        K_bloque = np.atleast_1d(K_I(sigma, a_bloque, da, W, cuadratura,
+                                     n_gauss, paneles))
+        umbral   = umbral_propagacion(a_bloque, MAT)
+        v_a.append(a_bloque)
+        v_K.append(K_bloque)
+        
+        #Solo se buscan en el bloque la rotura y la parada de las geometrias
+        #que aun no han roto ni se han detenido. La parada solo cuenta si es
+        #anterior a la rotura
+        for j, phi in enumerate(v_phi):
+            if rotura[j] is not None or parada[j] is not None:
+                continue
+            ind_rot = np.flatnonzero(K_bloque/phi >= K_IC)
+            ind_par = np.flatnonzero(K_bloque/phi < umbral)
+            if len(ind_par) and (not len(ind_rot) or ind_par[0] < ind_rot[0]):
+                parada[j] = n + ind_par[0]
+            elif len(ind_rot):
+                rotura[j] = n + ind_rot[0]
+        
+        n += n_bloque
+        
+        #Se limita la longitud por si K_I no alcanza K_IC ni cae por debajo
+        #del umbral
+        if a_bloque[-1] > 1e3*W:
+            break
+    
+    return np.concatenate(v_a), np.concatenate(v_K), rotura, parada
+
+###############################################################################
+###############################################################################
+
+def detencion_grieta(sigma, ind_a, a_i, phi, da, W, MAT, 
+                     cuadratura="punto_medio", n_gauss=N_GAUSS, 
+                     paneles=None):
+    """Comprueba, antes de integrar, si la grieta se detiene: si K_I cae por
+    debajo del umbral de crecimiento en algun paso de la propagacion antes 
+    de la rotura (ver historia_KI).
+    
+    INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
+                    (float)   --> tension uniforme
+                    (ndarray) --> perfil de tensiones desde la superficie
+                                  con paso da
+            ind_a = indice asociado a la longitud de grieta
+            a_i   = (m) longitud inicial de la grieta
+            phi   = factor de la grieta eliptica
+            da    = (m) paso de longitudes de grietas
+            W     = (m) anchura del especimen
+            MAT   = indice asignado al material
+            cuadratura = cuadratura de la integral de K_I (ver K_I)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
+            
+    OUTPUT: a_parada = (m) longitud a la que se detiene la grieta o None si
+                       la grieta crece hasta la rotura"""
+    
+    v_a, _, _, parada = historia_KI(sigma, a_i, [phi], da, W, MAT, 
+                                    cuadratura, n_gauss, paneles)
+    
+    if parada[0] is not None:
+        return float(v_a[parada[0]])
+    
+    return None
+
+###############################################################################
+###############################################################################
+
+def integracion_adaptativa(sigma, a_i, phi, da, W, MAT, rtol=1e-6, 
+                           atol=1e-2, cuadratura="punto_medio", x=None,
+                           n_gauss=N_GAUSS, paneles=None):
+    """Integra el crecimiento de la grieta como una ecuacion diferencial en a,
+    dN/da = 1/(C*(K_I^n - K_th^n)), con paso adaptativo y control del error.
+    La integracion termina cuando K_I alcanza K_IC (evento terminal), cuando
+    K_I cae por debajo del umbral de crecimiento (la grieta se detiene) o 
+    cuando la grieta atraviesa el espesor del especimen.
+    
+    INPUTS: sigma = (MPa) tension perpendicular al plano de la grieta
+                    (float)   --> tension uniforme
+                    (ndarray) --> perfil de tensiones desde la superficie. 
+                                  Entre nodos se interpola.
+            a_i   = (m) longitud inicial de la grieta
+            phi   = factor de la grieta eliptica
+            da    = (m) paso inicial de la integracion y ancho maximo de los
+                    intervalos de la integral de K_I. Si no se indica x, es
+                    tambien el paso de los nodos del perfil de tensiones
+            W     = (m) anchura del especimen
+            MAT   = indice asignado al material
+            rtol  = tolerancia relativa de la integracion
+            atol  = (ciclos) tolerancia absoluta de la integracion
+            cuadratura = "punto_medio" --> K_I_interpolado
+                         "gauss" --> K_I_gauss
+            x     = (m) profundidad de los nodos del perfil de tensiones
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver 
+                    K_I_gauss)
+            
+    OUTPUT: sol   = solucion de solve_ivp con salida densa. sol.t[-1] es la
+                    longitud de rotura y sol.y[0,-1] los ciclos de
+                    propagacion. Si la grieta se detiene, sol.a_parada es la
+                    longitud de parada (None si rompe). Si K_I ya alcanza 
+                    K_IC en a_i no se integra y la solucion tiene cero 
+                    ciclos de propagacion
+
+    Si el integrador falla o la grieta atraviesa el espesor sin alcanzar
+    K_IC se produce IntegracionFallida."""
+    
+    K_IC = MAT["K_IC"]
+    ki   = funcion_KI(sigma, phi, da, W, x, cuadratura, n_gauss, paneles)
+    
+    #El evento de rotura solo se detecta cuando K_I cruza K_IC. Si la grieta
+    #ya rompe en a_i no hay propagacion
+    if ki(a_i) >= K_IC:
+        return OptimizeResult(t=np.array([a_i]), y=np.zeros((1, 1)),
+                              sol=lambda a: np.zeros((1,) + np.shape(a)),
+                              t_events=[np.array([a_i]), np.array([])],
+                              a_parada=None, status=1, success=True,
+                              message="K_I alcanza K_IC en a_i")
+    
+    def dN_da(a, N):
+        """Velocidad de crecimiento inversa de la grieta"""
+        return [integr_ciclos(ki(a), a, MAT)]
+    
+    def rotura(a, N):
+        """Evento de rotura: K_I = K_IC"""
+        return ki(a) - K_IC
+    rotura.terminal  = True
+    rotura.direction = 1.0
+    
+    def detencion(a, N):
+        """Evento de detencion: K_I cae por debajo del umbral"""
+        return ki(a) - umbral_propagacion(a, MAT)
+    detencion.terminal  = True
+    detencion.direction = -1.0
+    
+    sol = solve_ivp(dN_da, (a_i, W), [0.0], method='RK45', 
+                    events=[rotura, detencion], dense_output=True, rtol=rtol,
+                    atol=atol, first_step=da)
+
+    sol.a_parada = (float(sol.t_events[1][0]) if len(sol.t_events[1])
+                    else None)
+
+    #Cuando K_I se acerca al umbral el integrando crece sin limite y el 
+    #integrador puede fallar antes de localizar el evento de detencion. El 
+    #fallo solo es una detencion si la grieta cae por debajo del umbral a 
+    #partir del punto de fallo antes de alcanzar K_IC
+    if not sol.success:
+        sol.a_parada = parada_tras_fallo(ki, sol.t[-1], da, W, MAT)
+        if sol.a_parada is None:
+            raise IntegracionFallida("Fallo de la integracion en a = {:.3e} "
+                                     "m: {}".format(sol.t[-1], sol.message))
+            
+    #Solo son validas las integraciones que terminan en un evento
+    elif not len(sol.t_events[0]) and not len(sol.t_events[1]):
+        raise IntegracionFallida("La grieta atraviesa el espesor sin "
+                                 "alcanzar K_IC")
+
+    return sol
+
+###############################################################################
+###############################################################################
+
+def parada_tras_fallo(ki, a_f, da, W, MAT):
+    """Busca la detencion de la grieta a partir del punto en el que ha 
+    fallado la integracion adaptativa. Se recorren las longitudes 
+    a_f + da*[0, 1, ...] hasta que K_I cae por debajo del umbral de 
+    crecimiento, alcanza K_IC o la grieta atraviesa el espesor.
+    
+    INPUTS: ki       = funcion ki(a) (ver funcion_KI)
+            a_f      = (m) longitud en la que ha fallado la integracion
+            da       = (m) paso de la busqueda
+            W        = (m) anchura del especimen
+            MAT      = indice asignado al material
+            
+    OUTPUT: a_parada = (m) longitud a la que se detiene la grieta o None si
+                       no se detiene"""
+    
+    K_IC = MAT["K_IC"]
+    
+    for a in np.arange(a_f, W, da):
+        k = ki(a)
+        if k >= K_IC:
+            return None
+        if k < umbral_propagacion(a, MAT):
+            return float(a)
+        
+    return None
+
+###############################################################################
+###############################################################################
+
+def fase_propagacion(sigma, ind_a, a_i, ac,da, W, MAT, 
+                     integrador="paso_fijo", cuadratura="punto_medio",
+                     n_gauss=N_GAUSS, paneles=None):
     """Devuelve los ciclos de propagacion de la grieta.
     
     INPUTS: sigma    = (MPa) tensión maxima perpendicular al plano de la grieta
-                       (float) --> fase de iniciación
-                       (list)  --> fase de propagación       
+                       (float)   --> fase de iniciación
+                       (ndarray) --> fase de propagación       
             ind_a   = indice asociado a la longitud de grieta
             a_i     = (m) longitud inicial de la grieta
-            ac      = plana o eliptica (0 o 0.5)
+            ac      = plana o eliptica (0 o 0.5). Con una lista de 
+                      geometrias se calculan todas a la vez (ver 
+                      fase_propagacion_multiple)
             da      = (m) paso de longitudes de grietas
             W       = (m) anchura del especimen
             MAT     = indice asignado al material
+            integrador = "paso_fijo" --> pasos de longitud da
+                         "adaptativo" --> paso adaptativo con control del 
+                         error (ver integracion_adaptativa)
+            cuadratura = "punto_medio" o "gauss" (ver K_I)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
 
-    OUTPUT: N_p     = ciclos de la fase de propagacion"""
+    OUTPUT: N_p     = ciclos de la fase de propagacion. Si la grieta se 
+                      detiene antes de romper se devuelve GrietaDetenida. 
+                      Con una lista de geometrias, lista con los ciclos de
+                      cada una"""
     
-    #Obtenemos las constantes del material
-    # mat_props = constantes_material(MAT)
+    #Con varias geometrias de grieta se comparte la historia de K_I
+    if isinstance(ac, (list, tuple, np.ndarray)):
+        return fase_propagacion_multiple(sigma, ind_a, a_i, ac, da, W, MAT,
+                                         integrador, cuadratura, n_gauss,
+                                         paneles)
     
-    C    = MAT["C"]
-    n    = MAT["n"]
-    f    = MAT["f"]
-    l_0  = MAT["l_0"]
-    K_th = MAT["K_th"]
-    a_0  = MAT["a_0"]
     K_IC = MAT["K_IC"]
+    phi  = Phi(relacion_ac(ac))
     
-
-    def integr_prop(x, s, ac):
-        """Realiza el cálculo de la integral de los ciclos de propagación"""
-        phi = Phi(ac)
-        ki = K_I(s, x, da, W)/phi
-
-        if ki < K_th*(x**f/(x**f + a_0**f - l_0**f))**(0.5*f):
-            res = 1e20
-        else:
-            res = 1.0/(C*(ki**n
-                          - (K_th*(x**f/(x**f + a_0**f - l_0**f))**(0.5*f))**n))
-        
-        return ki, res            
+    #Si la grieta se detiene antes de romper no es necesario integrar
+    a_parada = detencion_grieta(sigma, ind_a, a_i, phi, da, W, MAT, 
+                                cuadratura, n_gauss, paneles)
+    if a_parada is not None:
+        return GrietaDetenida(a_parada)
     
-    #Si sigma es de tipo float, el cálculo es para la fase de iniciación
-    # ac  = 0.5
-
-    if ac == "plana":
-        ac = 0.0
-    elif ac == "eliptica":
-        ac =0.5
+    if integrador == "adaptativo":
+        sol = integracion_adaptativa(sigma, a_i, phi, da, W, MAT,
+                                     cuadratura=cuadratura, n_gauss=n_gauss,
+                                     paneles=paneles)
+        if sol.a_parada is not None:
+            return GrietaDetenida(sol.a_parada)
+        return float(sol.y[0, -1])
     
     N_p = 0.0
     a   = a_i 
     ki  = 0.0
-    if type(sigma) is not list:
+    #Si sigma es de tipo float, el cálculo es para la fase de iniciación
+    if np.ndim(sigma) == 0:
+        #Con tension uniforme K_I es analitico, por lo que se evaluan bloques
+        #de pasos de una vez hasta encontrar el paso en el que se alcanza K_IC
+        n_bloque = 1024
         while ki < K_IC:
-            N_p += integr_prop(a, sigma, ac)[1]*da
-            ki   = integr_prop(a, sigma, ac)[0]
-            a   += da
+            v_a      = a + da*np.arange(n_bloque)
+            v_ki, v_res = integr_prop(v_a, sigma, phi, da, W, MAT)
+            rotura   = np.flatnonzero(v_ki >= K_IC)
+            n        = rotura[0] + 1 if len(rotura) else n_bloque
+            N_p     += float(np.sum(v_res[:n]))*da
+            ki       = v_ki[n - 1]
+            a       += n*da
 
-    #Si sigma es de tipo list, el cálculo es para la fase de propagación.
+    #Si sigma es un vector, el cálculo es para la fase de propagación.
     #Se empieza la integral en la longitud de iniciacion requerida y se va 
     #aumentando la longitud, utilizando la variable i, de forma que en cada
     #vuelta del bucle aumenta en 1 el tamaño del vector de tensiones y la
     #longitud de grieta consecuentemente con el paso.    
+    #Con la regla del punto medio la marcha se realiza en el núcleo de 
+    #cálculo, que puede estar compilado (ver nucleos)
+    elif cuadratura == "punto_medio":
+        sigma = np.asarray(sigma, dtype=float)
+        MAT   = como_material(MAT)
+        N_p   = float(nucleo("marcha_perfil")(sigma, ind_a, a_i, da, W, phi,
+                                              MAT.C, MAT.n, MAT.f, 
+                                              MAT.f_medio, MAT.c_umbral, 
+                                              MAT.K_th, K_IC))
+    
     else:
+        sigma = np.asarray(sigma, dtype=float)
         i =0
         while ki < K_IC:
-            #Invertimos los vectores de tensiones, ya que para el calculo de 
-            #K_IC la integral se inicia al fondo de la grieta acabando en 
-            #la superficie. Seleccionamos del vector completo de tensiones, las
-            #componentes del mismo que van desde la superficie hasta el tamaño
-            #de grieta asociado al indice ind_a            
-            sxx_max  = np.flipud(sigma[:ind_a + 1 + i]).tolist()
-            N_p     += integr_prop(a, sxx_max, ac)[1]*da
-            ki       = integr_prop(a, sxx_max, ac)[0]
+            #Seleccionamos del vector completo de tensiones, las componentes 
+            #del mismo que van desde la superficie hasta la punta de la 
+            #grieta. Es una vista del vector, no una copia.
+            ki, res  = integr_prop(a, sigma[:ind_a + 1 + i], phi, da, W,
+                                   MAT, cuadratura, n_gauss=n_gauss, 
+                                   paneles=paneles)
+            N_p     += res*da
             a       += da
             i       += 1
         
     return N_p
+
+###############################################################################
+###############################################################################
+
+def fase_propagacion_multiple(sigma, ind_a, a_i, v_ac, da, W, MAT,
+                              integrador="paso_fijo", 
+                              cuadratura="punto_medio", n_gauss=N_GAUSS,
+                              paneles=None):
+    """Devuelve los ciclos de propagacion de la grieta para varias geometrias
+    a la vez. Las geometrias solo se diferencian en el divisor Phi de K_I, 
+    por lo que la historia de K_I sin escalar se calcula una sola vez, hasta
+    la rotura de la geometria con mayor Phi, y de ella se obtienen los ciclos
+    de cada geometria.
+    
+    INPUTS: sigma    = (MPa) tensión maxima perpendicular al plano de la grieta
+                       (float)   --> fase de iniciación
+                       (ndarray) --> fase de propagación       
+            ind_a    = indice asociado a la longitud de grieta
+            a_i      = (m) longitud inicial de la grieta
+            v_ac     = lista de geometrias ("plana", "eliptica" o a/c)
+            da       = (m) paso de longitudes de grietas
+            W        = (m) anchura del especimen
+            MAT      = indice asignado al material
+            integrador = "paso_fijo" o "adaptativo". La integracion 
+                         adaptativa no comparte K_I entre geometrias y se 
+                         realiza una vez por geometria
+            cuadratura = "punto_medio" o "gauss" (ver K_I)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
+
+    OUTPUT: v_N_p    = lista con los ciclos de la fase de propagacion de 
+                       cada geometria (GrietaDetenida si se detiene)"""
+    
+    if integrador == "adaptativo":
+        return [fase_propagacion(sigma, ind_a, a_i, ac, da, W, MAT, 
+                                 integrador, cuadratura, n_gauss, paneles)
+                for ac in v_ac]
+    
+    #La historia de K_I sin escalar y la comprobacion de detencion son las
+    #mismas que con una sola geometria (ver detencion_grieta)
+    v_phi = [Phi(relacion_ac(ac)) for ac in v_ac]
+    v_a, v_K, rotura, parada = historia_KI(sigma, a_i, v_phi, da, W, MAT,
+                                           cuadratura, n_gauss, paneles)
+    
+    #Ciclos de cada geometria hasta su paso de rotura, incluido
+    v_N_p = []
+    for j, phi in enumerate(v_phi):
+        if parada[j] is not None:
+            v_N_p.append(GrietaDetenida(float(v_a[parada[j]])))
+            continue
+        n   = len(v_a) if rotura[j] is None else rotura[j] + 1
+        res = integr_ciclos(v_K[:n]/phi, v_a[:n], MAT)
+        v_N_p.append(float(np.sum(res))*da)
+        
+    return v_N_p
+
+###############################################################################
+###############################################################################
+
+def curvas_propagacion_uniforme(v_sigma, v_a, v_ac, da, W, MAT):
+    """Devuelve los ciclos de propagacion con tension uniforme para todas las
+    tensiones, longitudes iniciales y geometrias de una tabla de curvas de 
+    iniciacion con un unico calculo vectorizado.
+    
+    Con tension uniforme K_I es proporcional a la tension y creciente con la
+    longitud de grieta, por lo que todas las longitudes iniciales de una 
+    tension estan en la misma trayectoria de crecimiento. Se evalua K_I con 
+    tension unidad una sola vez en una malla de paso da desde la menor 
+    longitud inicial, se escala para cada tension y geometria (todas las 
+    trayectorias avanzan a la vez como filas de una matriz) y los ciclos de 
+    cada longitud inicial se obtienen de la suma acumulada inversa hasta la 
+    rotura, mas la fraccion de paso entre la longitud inicial y el primer 
+    nodo de la malla.
+    
+    INPUTS: v_sigma = (MPa) vector de tensiones
+            v_a     = (m) vector de longitudes iniciales de grieta
+            v_ac    = lista de geometrias ("plana", "eliptica" o a/c)
+            da      = (m) paso de longitudes de grietas
+            W       = (m) anchura del especimen
+            MAT     = indice asignado al material
+            
+    OUTPUT: N_p     = matriz (geometria, tension, longitud) de ciclos de 
+                      propagacion. Las grietas que se detienen antes de romper
+                      tienen ciclos infinitos"""
+    
+    K_IC    = MAT["K_IC"]
+    v_sigma = np.asarray(v_sigma, dtype=float)
+    v_a     = np.asarray(v_a, dtype=float)
+    v_phi   = np.array([Phi(relacion_ac(ac)) for ac in v_ac])
+    a_min   = np.min(v_a)
+    
+    #Malla de la trayectoria hasta la rotura de la trayectoria más lenta (la
+    #menor tension con la mayor Phi) o hasta la longitud maxima de 
+    #detencion_grieta
+    K_min = np.min(v_sigma)/np.max(v_phi)
+    a_fin = max(np.max(v_a), a_min)
+    while K_min*K_I_uniforme(1.0, a_fin, W) < K_IC and a_fin < 1e3*W:
+        a_fin *= 2.0
+    malla = a_min + da*np.arange(int(np.ceil((a_fin - a_min)/da)) + 2)
+    n_m   = len(malla)
+    
+    #K_I con tension unidad y umbral en la malla y en las longitudes 
+    #iniciales
+    K_malla   = K_I_uniforme(1.0, malla, W)
+    K_a       = K_I_uniforme(1.0, v_a, W)
+    umb_malla = umbral_propagacion(malla, MAT)
+    umb_a     = umbral_propagacion(v_a, MAT)
+    
+    #Primer nodo de la malla en o despues de cada longitud inicial
+    k_a   = np.minimum(np.ceil((v_a - a_min)/da - 1e-9).astype(int), n_m - 1)
+    fracc = malla[k_a] - v_a
+    
+    #Factor de escala de K_I de cada trayectoria: (geometria, tension)
+    escala = v_sigma[None, :]/v_phi[:, None]
+    
+    ki     = escala[:, :, None]*K_malla
+    res    = integr_ciclos(ki, np.broadcast_to(malla, ki.shape), MAT)
+    rotura = ki >= K_IC
+    parada = ki < umb_malla
+    
+    #Suma acumulada inversa, cortada en el siguiente paso de rotura de cada
+    #nodo, y siguiente paso por debajo del umbral
+    res     = np.where(parada, 0.0, res)
+    acum    = np.concatenate((np.cumsum(res[..., ::-1]*da, axis=-1)[..., ::-1],
+                              np.zeros(ki.shape[:-1] + (1,))), axis=-1)
+    nodos   = np.arange(n_m)
+    sig_rot = np.minimum.accumulate(np.where(rotura, nodos, n_m)[..., ::-1],
+                                    axis=-1)[..., ::-1]
+    sig_par = np.minimum.accumulate(np.where(parada, nodos, n_m)[..., ::-1],
+                                    axis=-1)[..., ::-1]
+    
+    #Ciclos desde el primer nodo de cada longitud inicial hasta la rotura
+    r_a   = sig_rot[..., k_a]
+    N_nod = (np.take_along_axis(acum, np.broadcast_to(k_a, r_a.shape), -1)
+             - np.take_along_axis(acum, np.minimum(r_a + 1, n_m), -1))
+    
+    #Paso desde la longitud inicial hasta el primer nodo
+    ki_a  = escala[:, :, None]*K_a
+    res_a = integr_ciclos(ki_a, np.broadcast_to(v_a, ki_a.shape), MAT)
+    N_p   = N_nod + res_a*fracc
+    
+    #Si la longitud inicial ya supera K_IC la grieta rompe en el primer paso
+    N_p = np.where(ki_a >= K_IC, res_a*da, N_p)
+    
+    #Las grietas que pasan por un paso por debajo del umbral antes de romper
+    #se detienen
+    detenida = ((ki_a < umb_a) 
+                | (sig_par[..., k_a] <= r_a)) & (ki_a < K_IC)
+    N_p = np.where(detenida, np.inf, N_p)
+    
+    return N_p
+
+###############################################################################
+###############################################################################
+
+#Curvas de propagacion ya calculadas. Los ciclos de propagacion de un 
+#experimento solo dependen del perfil de tensiones, la geometria de la grieta,
+#el paso, el espesor y el material, no del parametro de iniciacion, de forma
+#que los calculos con FS y SWT del mismo experimento comparten la curva.
+cache_curvas     = {}
+max_cache_curvas = 64
+
+def clave_argumento(arg):
+    """Devuelve una representacion hashable de un argumento de las funciones
+    de curvas de propagacion. Los vectores se identifican por su forma, tipo
+    y el resumen de su contenido."""
+    
+    if isinstance(arg, np.ndarray) or isinstance(arg, list):
+        arg = np.ascontiguousarray(arg)
+        return (arg.shape, arg.dtype.str, 
+                hashlib.sha1(arg.tobytes()).hexdigest())
+    if isinstance(arg, dict):
+        return tuple(sorted((k, clave_argumento(v)) for k, v in arg.items()))
+    if isinstance(arg, np.generic):
+        return arg.item()
+    
+    return arg
+
+def cache_curva(funcion):
+    """Decorador que guarda las curvas de propagacion calculadas por funcion
+    indexadas por sus argumentos. Cuando se supera max_cache_curvas se 
+    elimina la curva más antigua."""
+    
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        clave = (funcion.__name__, tuple(clave_argumento(a) for a in args),
+                 tuple(sorted((k, clave_argumento(v)) 
+                              for k, v in kwargs.items())))
+        
+        if clave not in cache_curvas:
+            if len(cache_curvas) >= max_cache_curvas:
+                del cache_curvas[next(iter(cache_curvas))]
+            cache_curvas[clave] = funcion(*args, **kwargs)
+        
+        #Se devuelve una copia para que el llamador pueda modificarla
+        return cache_curvas[clave].copy()
+    
+    return envoltura
+
+def vaciar_cache_curvas():
+    """Elimina las curvas de propagacion guardadas."""
+    
+    cache_curvas.clear()
+
+###############################################################################
+###############################################################################
+
+@cache_curva
+def curva_propagacion(sigma, v_ind_a, ac, da, W, MAT, integrador="paso_fijo",
+                      cuadratura="punto_medio", n_gauss=N_GAUSS, 
+                      paneles=None):
+    """Devuelve los ciclos de propagacion para todas las longitudes de 
+    iniciacion de un experimento con una sola integracion.
+    
+    En la fase de propagacion el integrando de cada paso solo depende del 
+    indice de la punta de la grieta y no de la longitud a la que empezo a 
+    crecer. Se integra una unica vez desde la menor longitud de iniciacion 
+    hasta alcanzar K_IC y los ciclos de cada longitud se obtienen como la suma
+    acumulada en sentido inverso.
+    
+    INPUTS: sigma   = (MPa) vector de tensiones maximas perpendiculares al 
+                      plano de la grieta desde la superficie
+            v_ind_a = vector de indices asociados a las longitudes de 
+                      iniciacion
+            ac      = plana o eliptica (0 o 0.5)
+            da      = (m) paso de longitudes de grietas
+            W       = (m) anchura del especimen
+            MAT     = indice asignado al material
+            integrador = "paso_fijo" --> pasos de longitud da
+                         "adaptativo" --> paso adaptativo con control del 
+                         error. Los ciclos de cada longitud se obtienen de la
+                         salida densa de la integracion.
+            cuadratura = "punto_medio" o "gauss" (ver K_I)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver K_I)
+
+    OUTPUT: N_p     = vector de ciclos de la fase de propagacion para cada
+                      indice de v_ind_a. Las grietas que se detienen antes 
+                      de romper tienen ciclos infinitos"""
+    
+    K_IC = MAT["K_IC"]
+    phi  = Phi(relacion_ac(ac))
+    
+    sigma   = np.asarray(sigma, dtype=float)
+    v_ind_a = np.asarray(v_ind_a, dtype=int)
+    k_min   = int(np.min(v_ind_a))
+    k_max   = int(np.max(v_ind_a))
+    
+    if integrador == "adaptativo":
+        N_p = curva_propagacion_continua(sigma, da*np.arange(len(sigma)),
+                                         v_ind_a*da, ac, da, W, MAT,
+                                         cuadratura=cuadratura, 
+                                         n_gauss=n_gauss, paneles=paneles)
+        return N_p
+    
+    #Evaluamos de una vez el integrando en todas las posiciones de la punta de
+    #la grieta del perfil a partir de la menor longitud de iniciacion y
+    #marcamos los pasos en los que se alcanza la tenacidad a fractura y en los
+    #que la grieta esta por debajo del umbral de crecimiento
+    #El umbral en los nodos del perfil solo depende del material y de la 
+    #malla y se reutiliza entre llamadas
+    v_k          = np.arange(k_min, len(sigma))
+    v_umbral     = curva_umbral(como_material(MAT), da, len(sigma))[k_min:]
+    v_ki, v_res  = integr_prop(v_k*da, sigma, phi, da, W, MAT,
+                               cuadratura, v_umbral, n_gauss, paneles)
+    v_rotura     = v_ki >= K_IC
+    v_parada     = v_ki < v_umbral
+    
+    #Si la grieta no rompe dentro del perfil despues de la mayor longitud de
+    #iniciacion, se sigue creciendo con el perfil completo hasta alcanzar 
+    #K_IC, igual que en fase_propagacion
+    v_res    = v_res.tolist()
+    v_rotura = v_rotura.tolist()
+    v_parada = v_parada.tolist()
+    k        = len(sigma)
+    while not any(v_rotura[k_max - k_min:]):
+        ki, res  = integr_prop(k*da, sigma, phi, da, W, MAT, cuadratura,
+                               n_gauss=n_gauss, paneles=paneles)
+        v_res.append(res)
+        v_rotura.append(ki >= K_IC)
+        v_parada.append(ki < umbral_propagacion(k*da, MAT))
+        k       += 1
+        
+    #Los pasos posteriores a la rotura de la mayor longitud de iniciacion no
+    #intervienen en el calculo
+    n_k      = k_max - k_min + v_rotura[k_max - k_min:].index(True) + 1
+    v_res    = np.asarray(v_res[:n_k])
+    v_rotura = np.asarray(v_rotura[:n_k])
+    v_parada = np.asarray(v_parada[:n_k])
+    
+    #Suma acumulada inversa. La suma se corta en el primer paso en el que se
+    #alcanza K_IC desde cada posicion, ya que ahi se detiene la grieta. Los
+    #pasos por debajo del umbral no se suman: las grietas que pasan por ellos
+    #se detienen y sus ciclos son infinitos.
+    v_res     = np.where(v_parada, 0.0, v_res)
+    acum      = np.append(np.cumsum(v_res[::-1]*da)[::-1], 0.0)
+    ind_rot   = np.where(v_rotura, np.arange(n_k), n_k)
+    sig_rot   = np.minimum.accumulate(ind_rot[::-1])[::-1]
+    ind_par   = np.where(v_parada, np.arange(n_k), n_k)
+    sig_par   = np.minimum.accumulate(ind_par[::-1])[::-1]
+    N_k       = acum[:-1] - acum[sig_rot + 1]
+    N_k[sig_par <= sig_rot] = np.inf
+        
+    N_p = N_k[v_ind_a - k_min]
+    
+    return N_p
+
+###############################################################################
+###############################################################################
+
+@cache_curva
+def curva_propagacion_continua(sigma, x, v_a, ac, ds, W, MAT, rtol=1e-6,
+                               cuadratura="punto_medio", n_gauss=N_GAUSS,
+                               paneles=None):
+    """Devuelve los ciclos de propagacion para un vector de longitudes de 
+    iniciacion cualesquiera, independientes de la malla del perfil de 
+    tensiones. Se realiza una unica integracion adaptativa desde la menor
+    longitud hasta la rotura y los ciclos de cada longitud se obtienen de la
+    salida densa.
     
+    INPUTS: sigma   = (MPa) vector de tensiones maximas perpendiculares al 
+                      plano de la grieta desde la superficie
+            x       = (m) profundidad de los nodos del perfil de tensiones
+            v_a     = (m) vector de longitudes de iniciacion
+            ac      = plana o eliptica (0 o 0.5)
+            ds      = (m) paso de la propagacion: paso inicial de la 
+                      integracion y ancho maximo de los intervalos de K_I
+            W       = (m) anchura del especimen
+            MAT     = indice asignado al material
+            rtol    = tolerancia relativa de la integracion
+            cuadratura = "punto_medio" o "gauss" (ver integracion_adaptativa)
+            n_gauss, paneles = opciones de la cuadratura de Gauss (ver 
+                      K_I_gauss)
+
+    OUTPUT: N_p     = vector de ciclos de la fase de propagacion para cada
+                      longitud de v_a. Las grietas que se detienen antes de 
+                      romper tienen ciclos infinitos"""
+    
+    phi = Phi(relacion_ac(ac))
+    ki  = funcion_KI(sigma, phi, ds, W, x, cuadratura, n_gauss, paneles)
+    v_a = np.asarray(v_a, dtype=float)
+    N_p = np.full_like(v_a, np.inf)
+    
+    #Se integra desde la menor longitud pendiente. Si la grieta se detiene,
+    #todas las longitudes anteriores a la parada tienen ciclos infinitos y se
+    #vuelve a integrar desde la siguiente longitud
+    pendientes = np.argsort(v_a)
+    while len(pendientes):
+        a_0 = v_a[pendientes[0]]
+        if ki(a_0) < umbral_propagacion(a_0, MAT):
+            pendientes = pendientes[1:]
+            continue
+        
+        sol = integracion_adaptativa(sigma, a_0, phi, ds, W, MAT, rtol=rtol,
+                                     cuadratura=cuadratura, x=x, 
+                                     n_gauss=n_gauss, paneles=paneles)
+        a_f = sol.t[-1]
+        
+        if sol.a_parada is not None:
+            pendientes = pendientes[v_a[pendientes] > sol.a_parada]
+        else:
+            N_p[pendientes] = (sol.y[0, -1] 
+                               - sol.sol(np.minimum(v_a[pendientes], a_f))[0])
+            pendientes = pendientes[:0]
+    
+    return N_p